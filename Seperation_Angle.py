@@ -1,16 +1,46 @@
 import streamlit as st
-from datetime import datetime, time
-from script_animate_SepAng_ReadFile_SrcList import main, create_or_clear_directory, labeling
+from datetime import datetime, time, timedelta
+from script_animate_SepAng_ReadFile_SrcList import (
+    SUMMARY_PREAMBLE, EXPORT_FORMATS, PROXIMITY_BODIES, GMRT_MIN_ELEVATION, run_session, format_parse_errors, labeling, load_observatories, observatory_locations, parse_source_list,
+    catalog_index, configure_iers, enable_logging, warm_up,
+    solar_exclusion_calendar, format_exclusion_calendar, plot_exclusion_calendar,
+    start_time_candidates, safe_start_windows, format_start_windows,
+)
+from jobs_SepAng import submit_job, job_status
+import io
 import os
+import logging
+import threading
 import base64
 
 
-with open("download.jpeg", "rb") as image_file:
-    base64_icon = base64.b64encode(image_file.read()).decode()
+# Images live in ./static and are served by Streamlit at app/static/<name>
+# (server.enableStaticServing in .streamlit/config.toml), so reruns only send their URLs
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STATIC_URL = "app/static"
+
+@st.cache_resource(show_spinner=False)
+def load_base64_asset(filename):
+    """Read and base64-encode a static asset once per server process."""
+    with open(os.path.join(STATIC_DIR, filename), "rb") as asset_file:
+        return base64.b64encode(asset_file.read()).decode()
+
+@st.cache_resource(show_spinner=False)
+def start_logging():
+    """Send the pipeline's warnings and failed-job tracebacks to the server's stderr, once per server process."""
+    if not os.environ.get("INPTA_LOG_LEVEL"):
+        enable_logging(logging.WARNING)
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    """Warm the pipeline up once per server process, in the background so the first page is not held up."""
+    thread = threading.Thread(target=warm_up, name="inpta-warm-up", daemon=True)
+    thread.start()
+    return thread
 
 st.set_page_config(
     page_title="Solar proximity prediction over the uGMRT antennas",
-    page_icon=f"data:image/jpeg;base64,{base64_icon}",
+    page_icon=f"data:image/jpeg;base64,{load_base64_asset('download.jpeg')}",
     layout="wide"
 )
 
@@ -74,30 +104,26 @@ st.markdown(hide_st_style, unsafe_allow_html=True)
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-OUTPUT_DIR = os.path.join(BASE_DIR, "output_final")
-SRCLIST_FILE = os.path.join(BASE_DIR, "Srclist.txt")
 OBSRV_COORD_FILE = os.path.join(BASE_DIR, "ObservatoryCoord.txt")
+# Display names of the observatories in ObservatoryCoord.txt
+OBSERVATORY_LABELS = {"GMRT": "uGMRT"}
+# Worker processes of the plotting pool (INPTA_WORKERS overrides the core count); the
+# pool is started once per server process and shared by the jobs running at once
+N_WORKERS = int(os.environ.get("INPTA_WORKERS", os.cpu_count() or 1))
 
-# Initialize session state
-if "output_folder" not in st.session_state:
-    st.session_state["output_folder"] = None
+# Initialize session state: every user keeps their own results in memory,
+# nothing is shared on disk between sessions
 if "generated_files" not in st.session_state:
-    st.session_state["generated_files"] = []
+    st.session_state["generated_files"] = {}
 
 def display_header():
-    with open("InPTA_logo-removebg.png", "rb") as logo_file:
-        encoded_logo = base64.b64encode(logo_file.read()).decode()
-
-    with open("gmrtarray_panorama1.jpg", "rb") as header_file:
-        encoded_header = base64.b64encode(header_file.read()).decode()
-
     header_html = f"""
     <div style="width: 100%; height: auto;">
         <a href="https://inpta.iitr.ac.in/" target="_blank">
-            <img src="data:image/png;base64,{encoded_logo}" alt="InPTA Logo" style="width: 100px; height: auto; position: absolute; top: 20px; left: 20px; z-index: 100;">
+            <img src="{STATIC_URL}/InPTA_logo-removebg.png" alt="InPTA Logo" style="width: 100px; height: auto; position: absolute; top: 20px; left: 20px; z-index: 100;">
         </a>
         <div style="margin-top: 80px;">
-            <img src="data:image/jpeg;base64,{encoded_header}" alt="Header Image" style="width: 200%; height: 200px;">
+            <img src="{STATIC_URL}/gmrtarray_panorama1.jpg" alt="Header Image" style="width: 200%; height: 200px;">
         </div>
     </div>
     """
@@ -117,7 +143,7 @@ def display_header():
         - A typical threshold for solar proximity is around 9 degrees for InPTA regular observations.
         - To use this tool, either upload the source list file or paste the source list from your observation command file. The required columns are Source Name, RA, DEC, Epoch. If any additional columns are present, the tool can still function.  
         - An example line: J0613-0200&nbsp;&nbsp;&nbsp;&nbsp;06h13m43.90s&nbsp;&nbsp;&nbsp;&nbsp;-02d00'47.20"&nbsp;&nbsp;&nbsp;&nbsp;2000.0
-        - Currently, this tool supports only sources observed from the uGMRT.
+        - One or several observatories (listed in ObservatoryCoord.txt) can be evaluated in the same run; the uGMRT is selected by default.
         """,
         unsafe_allow_html=True,
     )
@@ -192,9 +218,6 @@ def display_form():
             key="source_list",
         )
 
-    if srclist_data.strip():
-        with open(SRCLIST_FILE, "w") as file:
-            file.write(srclist_data)
 
     observation_date = st.date_input("Observation Date in IST (YYYY/MM/DD)")
     #observation_start_time = st.text_input("Observation Start Time in IST (HH:MM:SS)", placeholder="HH:MM:SS")
@@ -249,55 +272,261 @@ def display_form():
     start_time_ist = f"{observation_date} {observation_start_time}"
     observation_duration = st.number_input("Observation Duration (in hours)", min_value=0.0, step=0.1)
     threshold_angle = st.number_input("Threshold Separation Angle (degrees)", min_value=0.0, step=0.1)
-    observatory_name = st.selectbox("Select Observatory", ["Please select your obs name", "uGMRT"])
-    observatory_name = "GMRT" if observatory_name == "uGMRT" else None
-    
-    if st.button("Submit"):
-        if srclist_data.strip() and observatory_name:
-            with st.spinner("Processing may take some time please wait (2-3 mins)..."):
-                filename_label = labeling(
-                    observation_date.strftime('%Y-%m-%d'), observation_start_time
-                )
-                create_or_clear_directory(OUTPUT_DIR, filename_label)
-                summary_file = os.path.join(OUTPUT_DIR, f"summary_{filename_label}.txt")
-                with open(summary_file, 'a') as file:
-                    file.write(f"Observatory Name: {observatory_name} \n")
-                    file.write(f"Start Time: {start_time_ist} \n")
-                    file.write(f"Observation Duration: {observation_duration} \n")
-    
-                main(
-                    OBSRV_COORD_FILE,
-                    OUTPUT_DIR,
-                    summary_file,
-                    SRCLIST_FILE,
-                    start_time_ist,
-                    observation_duration,
-                    threshold_angle,
-                    observatory_name,
-                    filename_label
+    observatory_names = st.multiselect(
+        "Select Observatories",
+        list(load_observatories(OBSRV_COORD_FILE)),
+        default=["GMRT"],
+        format_func=lambda name: OBSERVATORY_LABELS.get(name, name),
+    )
+    ephemeris_mode = st.radio(
+        "Solar Ephemeris Accuracy",
+        ["Precise (astropy)", "Fast (~1 arcmin)"],
+        horizontal=True,
+    )
+    ephemeris_backend = "fast" if ephemeris_mode.startswith("Fast") else "precise"
+    proximity_bodies = st.multiselect(
+        "Also check proximity to (sidelobe and RFI avoidance)",
+        PROXIMITY_BODIES,
+        format_func=str.capitalize,
+    )
+    other_bodies = {}
+    if proximity_bodies:
+        for column, body in zip(st.columns(len(proximity_bodies)), proximity_bodies):
+            with column:
+                other_bodies[body] = st.number_input(
+                    f"{body.capitalize()} threshold (degrees)", min_value=0.0, value=5.0, step=0.1, key=f"threshold_{body}"
                 )
-                with open(summary_file, "r") as file:
-                    st.session_state["summary_contents"] = file.read()
-    
-                st.session_state["output_folder"] = OUTPUT_DIR
-                st.session_state["generated_files"] = [
-                    f for f in os.listdir(OUTPUT_DIR) if os.path.isfile(os.path.join(OUTPUT_DIR, f))
-                ]
+    min_elevation = None
+    if len(observatory_names) == 1 and st.checkbox("Only flag proximity while the source is above the elevation limit"):
+        min_elevation = st.number_input(
+            "Elevation limit (degrees)", min_value=0.0, max_value=90.0, value=GMRT_MIN_ELEVATION, step=0.5
+        )
+    export_formats = st.multiselect(
+        "Machine-readable exports (separation matrix, source metadata and crossings)",
+        EXPORT_FORMATS,
+        default=["csv"],
+        format_func=str.upper,
+    )
+    near_sun_only = st.checkbox("Large catalog: only list the sources that come within a threshold")
+    animation_format = None
+    if len(observatory_names) == 1 and st.checkbox("Sky-map animation of the Sun and source tracks (GIF)"):
+        animation_format = "gif"
     
+    if st.button("Submit"):
+        if srclist_data.strip() and observatory_names:
+            filename_label = labeling(
+                observation_date.strftime('%Y-%m-%d'), observation_start_time
+            )
+            job_id = submit_job(
+                process_submission,
+                srclist_data,
+                observatory_names,
+                start_time_ist,
+                observation_duration,
+                threshold_angle,
+                filename_label,
+                {
+                    "backend": ephemeris_backend,
+                    "workers": N_WORKERS,
+                    "export_formats": export_formats,
+                    "other_bodies": other_bodies,
+                    "min_elevation": min_elevation,
+                    "animation_format": animation_format,
+                    "near_sun_only": near_sun_only,
+                },
+            )
+            st.session_state["job_id"] = job_id
+            st.session_state.pop("loaded_job", None)
+            st.query_params["job"] = job_id
+
+    display_job_progress()
+
+    if st.session_state.get("loaded_job"):
+        if st.session_state["processing_error"]:
+            st.error(f"Processing failed: {st.session_state['processing_error']}")
+        else:
             st.success("Processing complete. Files are ready for download below.")
     
     if "summary_contents" in st.session_state:
         st.subheader("Summary File Contents:")
         st.code(st.session_state["summary_contents"], language="text")
 
+def process_submission(srclist_data, observatory_names, start_time_ist, observation_duration, threshold_angle,
+                       filename_label, options, progress, publish):
+    """Job body: run one submission through run_session, publishing the summary and files after every source.
+
+    The separation is shared by all observatories; with several of them a
+    per-site section is appended. Returns the final summary text, files and
+    error message.
+    """
+    header = (
+        SUMMARY_PREAMBLE
+        + f"Observatory Name: {', '.join(observatory_names)} \n"
+        + f"Start Time: {start_time_ist} \n"
+        + f"Observation Duration: {observation_duration} \n"
+    )
+    target_names, ra_strings, dec_strings, target_coords, parse_errors = parse_source_list(srclist_data)
+    locations = observatory_locations(OBSRV_COORD_FILE, observatory_names)
+    if len(observatory_names) == 1:
+        location, site_names = locations[0], None
+    else:
+        location, site_names = locations, list(observatory_names)
+    catalog = catalog_index(target_coords) if options["near_sun_only"] and target_names else None
+
+    def publish_partial(summary_text, files):
+        publish({"summary_contents": header + summary_text, "generated_files": files})
+
+    try:
+        summary_text, files, _ = run_session(
+            target_names,
+            ra_strings,
+            dec_strings,
+            target_coords,
+            location,
+            start_time_ist,
+            observation_duration,
+            threshold_angle,
+            filename_label,
+            options,
+            parse_errors=parse_errors,
+            progress=progress,
+            site_names=site_names,
+            catalog=catalog,
+            publish=publish_partial,
+        )
+        processing_error = None
+    except ValueError as e:
+        summary_text = format_parse_errors(parse_errors) if parse_errors else ""
+        files = {}
+        processing_error = str(e)
+
+    summary_text = header + summary_text
+    return {
+        "summary_contents": summary_text,
+        "generated_files": {f"summary_{filename_label}.txt": summary_text.encode("utf-8"), **files},
+        "processing_error": processing_error,
+    }
+
+@st.fragment(run_every=2)
+def display_job_progress():
+    """Poll the session's job and load its result into the session once it has finished."""
+    job_id = st.session_state.get("job_id") or st.query_params.get("job")
+    if not job_id or st.session_state.get("loaded_job") == job_id:
+        return
+    st.session_state["job_id"] = job_id
+
+    job = job_status(job_id)
+    if job is None:
+        st.warning("This job is no longer available, please submit again.")
+        st.session_state["job_id"] = None
+        st.query_params.pop("job", None)
+    elif job["state"] == "queued":
+        st.info("Your submission is queued and will start shortly...")
+    elif job["state"] == "running":
+        total = job["total"]
+        st.progress(
+            job["done"] / total if total else 0.0,
+            text=f"Processing ({job['stage'] or 'starting'}): {job['done']}/{total} sources",
+        )
+        # results of the sources finished so far
+        if job["partial"]:
+            st.code(job["partial"]["summary_contents"], language="text")
+            for filename, file_data in job["partial"]["generated_files"].items():
+                st.download_button(
+                    label=f"Download {filename}",
+                    data=file_data,
+                    file_name=filename,
+                    mime="application/octet-stream",
+                )
+    else:
+        if job["state"] == "failed":
+            result = {"summary_contents": "", "generated_files": {}, "processing_error": job["error"]}
+        else:
+            result = job["result"]
+        st.session_state.update(result)
+        st.session_state["loaded_job"] = job_id
+        st.rerun()
+
+def display_planner():
+    with st.expander("Observing-Cycle Planner: Solar Exclusion Calendar"):
+        st.write(
+            "Lists, for every source in the list above, the calendar windows during which it stays within the threshold of the Sun."
+        )
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            plan_start = st.date_input("From (UTC)", key="plan_start")
+        with col2:
+            plan_end = st.date_input("To (UTC)", value=plan_start + timedelta(days=365), key="plan_end")
+        with col3:
+            plan_threshold = st.number_input("Threshold Separation Angle (degrees)", min_value=0.0, value=9.0, step=0.1, key="plan_threshold")
+
+        if st.button("Build Calendar"):
+            target_names, _, _, target_coords, _ = parse_source_list(st.session_state.get("source_list", ""))
+            if not target_names or plan_end < plan_start:
+                st.error("Please provide a source list and a valid date range.")
+            else:
+                start_date, end_date = plan_start.strftime('%Y-%m-%d'), plan_end.strftime('%Y-%m-%d')
+                label = f"{start_date}_to_{end_date}"
+                with st.spinner("Building the exclusion calendar..."):
+                    calendar = solar_exclusion_calendar(target_names, target_coords, start_date, end_date, plan_threshold)
+                    figure = io.BytesIO()
+                    plot_exclusion_calendar(calendar, target_names, start_date, end_date, plan_threshold, figure)
+                st.dataframe(calendar)
+                planner_files = {
+                    f"exclusion_calendar_{label}.txt": format_exclusion_calendar(calendar, start_date, end_date, plan_threshold).encode("utf-8"),
+                    f"exclusion_calendar_{label}.pdf": figure.getvalue(),
+                }
+                for filename, file_data in planner_files.items():
+                    st.download_button(
+                        label=f"Download {filename}",
+                        data=file_data,
+                        file_name=filename,
+                        mime="application/octet-stream",
+                    )
+
+def display_start_optimizer():
+    with st.expander("Start-Time Optimizer: Safest Session Start"):
+        st.write(
+            "Searches start times (IST) and session lengths over a window and ranks the start windows that keep every source in the list above more than the threshold away from the Sun."
+        )
+        col1, col2 = st.columns(2)
+        with col1:
+            opt_start_date = st.date_input("Earliest start date (IST)", key="opt_start_date")
+            opt_start_time = st.time_input("Earliest start time (IST)", value=time(0, 0), key="opt_start_time")
+            opt_durations = st.multiselect("Session lengths (hours)", list(range(1, 25)), default=[8], key="opt_durations")
+        with col2:
+            opt_end_date = st.date_input("Latest start date (IST)", value=opt_start_date + timedelta(days=7), key="opt_end_date")
+            opt_end_time = st.time_input("Latest start time (IST)", value=time(0, 0), key="opt_end_time")
+            opt_step = st.selectbox("Start-time step (minutes)", [5, 10, 15, 30, 60], index=1, key="opt_step")
+        opt_threshold = st.number_input("Threshold Separation Angle (degrees)", min_value=0.0, value=9.0, step=0.1, key="opt_threshold")
+
+        if st.button("Find Start Windows"):
+            target_names, _, _, target_coords, _ = parse_source_list(st.session_state.get("source_list", ""))
+            window_start = datetime.combine(opt_start_date, opt_start_time).strftime('%Y-%m-%d %H:%M:%S')
+            window_end = datetime.combine(opt_end_date, opt_end_time).strftime('%Y-%m-%d %H:%M:%S')
+            if not target_names or not opt_durations or window_end < window_start:
+                st.error("Please provide a source list, at least one session length and a valid start-time window.")
+            else:
+                with st.spinner("Searching start times..."):
+                    candidates = start_time_candidates(
+                        target_names, target_coords, window_start, window_end, opt_durations, opt_threshold, step_minutes=opt_step
+                    )
+                    windows = safe_start_windows(candidates)
+                st.dataframe(windows)
+                label = f"{window_start[:10]}_to_{window_end[:10]}"
+                st.download_button(
+                    label=f"Download start_windows_{label}.txt",
+                    data=format_start_windows(windows, window_start, window_end, opt_threshold).encode("utf-8"),
+                    file_name=f"start_windows_{label}.txt",
+                    mime="application/octet-stream",
+                )
+
 def display_pdfs():
-    if st.session_state["output_folder"] and st.session_state["generated_files"]:
+    if st.session_state["generated_files"]:
         st.subheader("View and Download Generated Files:")
-        for filename in st.session_state["generated_files"]:
-            file_path = os.path.join(st.session_state["output_folder"], filename)
-            with open(file_path, "rb") as file:
-                file_data = file.read()
-
+        for filename, file_data in st.session_state["generated_files"].items():
+            if filename.endswith(".gif"):
+                st.image(file_data, caption=filename)
             st.download_button(
                 label=f"Download {filename}",
                 data=file_data,
@@ -306,14 +535,11 @@ def display_pdfs():
             )
 
 def display_footer():
-    with open("download.jpeg", "rb") as footer_file:
-        encoded_footer = base64.b64encode(footer_file.read()).decode()
-
     footer_html = f"""
             <div style="background-color: #f0f0f0; color: black; padding: 20px; font-family: Arial, sans-serif; bottom: 0; left: 0; width: 100%; z-index: 1000;">
         <div style="display: flex; justify-content: space-between; align-items: center; width: 100%; max-width: 100%;">
             <div style="display: flex; align-items: center;">
-                <img src="data:image/jpeg;base64,{encoded_footer}" alt="Footer Logo" style="width: 70px; height: 70; margin-right: 15px;">
+                <img src="{STATIC_URL}/download.jpeg" alt="Footer Logo" style="width: 70px; height: 70; margin-right: 15px;">
                 <div>
                     <h1 style="color: #00008B; margin: 0;">Indian Pulsar Timing Array</h1>
                     <div style="margin: 0px 0; display: flex; align-items: center;">
@@ -361,7 +587,12 @@ def display_footer():
 
 # Main App
 if __name__ == "__main__":
+    start_logging()
+    configure_iers()
+    start_warm_up()
     display_header()
     display_form()
+    display_planner()
+    display_start_optimizer()
     display_pdfs()
     display_footer()
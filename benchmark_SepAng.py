@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""Offline benchmark of the solar separation pipeline.
+
+Runs main() and get_positions() on synthetic source lists over a grid of
+source counts, session lengths and sampling intervals, records the time
+spent in every pipeline stage and the peak traced memory, and writes the
+results to a JSON file that can be compared between commits:
+
+    ./benchmark_SepAng.py -o before.json
+    ./benchmark_SepAng.py -o after.json --compare before.json
+"""
+
+import os
+import json
+import time
+import shutil
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import warnings
+from datetime import datetime
+
+# Keep the benchmark away from the user's ephemeris cache: every run starts
+# from a private cache directory that is warmed up before timing. The
+# pipeline reads the variable on import; the directory is created in __main__.
+BENCH_DIR = os.path.join(tempfile.gettempdir(), f"inpta_bench_{os.getpid()}")
+os.environ["INPTA_EPHEMERIS_CACHE"] = os.path.join(BENCH_DIR, "ephemeris")
+
+import numpy as np
+import astropy
+import astropy.units as u
+from astropy.coordinates import EarthLocation
+
+import script_animate_SepAng_ReadFile_SrcList as pipeline
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OBSRV_COORD_FILE = os.path.join(BASE_DIR, "ObservatoryCoord.txt")
+START_TIME_IST = "2025-03-01 08:00:00"
+THRESHOLD = 9.0
+SEED = 1234
+
+
+def write_synthetic_source_list(path, n_sources, seed=SEED):
+    """Source list with n_sources positions spread uniformly over the sky (fixed seed)."""
+    rng = random.Random(seed)
+    with open(path, "w") as file:
+        for i in range(n_sources):
+            ra_hours = rng.uniform(0.0, 24.0)
+            dec_deg = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0)))
+            file.write(f"BENCH{i:05d}    {ra_hours:.6f}h    {dec_deg:+.6f}d    2000.0\n")
+    return path
+
+
+def run_main(src_list_file, hours, interval_minutes, backend, per_source_pdfs, workers):
+    """One main() run in a fresh output folder; returns its stage timings."""
+    outputfolder = tempfile.mkdtemp(dir=BENCH_DIR)
+    summary = pipeline.create_or_clear_directory(outputfolder, "bench")
+    return pipeline.main(OBSRV_COORD_FILE, outputfolder, summary, src_list_file, START_TIME_IST, hours,
+                         THRESHOLD, "GMRT", "bench", dict(backend=backend, per_source_pdfs=per_source_pdfs,
+                                                          workers=workers, interval_minutes=interval_minutes))
+
+
+def run_get_positions(hours, interval_minutes, backend):
+    """One single-source get_positions() run (AltAz path); returns its stage timings."""
+    start_utc = pipeline.convert_ist_to_utc(START_TIME_IST)
+    end_utc = pipeline.convert_ist_to_utc(pipeline.endtimecalc(START_TIME_IST, hours))
+    times = pipeline.generate_time_range(start_utc, end_utc, interval_minutes)
+    latitude, longitude = pipeline.observatory_coord(OBSRV_COORD_FILE, "GMRT")
+    timings = {}
+    pipeline.get_positions(times, EarthLocation(lat=latitude, lon=longitude),
+                           pipeline.angle_to_deg("06h13m43.9s", True) * u.deg,
+                           pipeline.angle_to_deg("-02d00m47.2s", False) * u.deg,
+                           backend=backend, timings=timings, altaz=True)
+    return timings
+
+
+def measure(func, repeat, memory):
+    """Best-of-repeat wall time and stage timings, plus traced peak memory (MB) from one extra run."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        timings = func()
+        total = time.perf_counter() - start
+        if best is None or total < best[0]:
+            best = (total, timings)
+
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        func()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        tracemalloc.stop()
+
+    total, timings = best
+    return {
+        "total_s": round(total, 6),
+        "stages_s": {name: round(value, 6) for name, value in timings.items()},
+        "peak_mem_mb": None if peak_mb is None else round(peak_mb, 3),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def case_key(record):
+    return (record["case"], record["n_sources"], record["hours"], record["interval_minutes"], record["backend"])
+
+
+def compare(results, baseline_file):
+    """Print the total-time ratio of every case against a previous results file."""
+    with open(baseline_file, "r") as file:
+        baseline = {case_key(record): record for record in json.load(file)["results"]}
+
+    print(f"\nComparison against {baseline_file} (ratio > 1 means slower now):")
+    for record in results:
+        old = baseline.get(case_key(record))
+        if old is None:
+            continue
+        ratio = record["total_s"] / old["total_s"] if old["total_s"] else float("inf")
+        flag = "  <-- regression" if ratio > 1.2 else ""
+        print(f"{record['case']:<14} {record['n_sources']:>5} src {record['hours']:>4} h "
+              f"{record['interval_minutes']:>3} min {record['backend']:<8} "
+              f"{old['total_s']:9.3f} s -> {record['total_s']:9.3f} s  x{ratio:5.2f}{flag}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the solar separation pipeline.")
+    parser.add_argument("--sources", type=int, nargs="+", default=[1, 10, 100, 1000], help="source counts")
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 8, 24], help="session lengths (hours)")
+    parser.add_argument("--intervals", type=int, nargs="+", default=[10, 1], help="sampling intervals (minutes)")
+    parser.add_argument("--backends", nargs="+", default=["precise"], choices=sorted(pipeline.SUN_BACKENDS))
+    parser.add_argument("--workers", type=int, default=1, help="worker processes passed to main()")
+    parser.add_argument("--per-source-pdfs", action="store_true", help="also write one PDF per source")
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per case (best is kept)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory run")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="results file (JSON)")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    return parser.parse_args()
+
+
+def run_benchmark(args):
+    warnings.simplefilter("ignore")
+
+    # warm-up: imports, IERS tables and the ephemeris cache for the benchmark dates
+    warmup_list = write_synthetic_source_list(os.path.join(BENCH_DIR, "warmup.txt"), 2)
+    for backend in args.backends:
+        run_main(warmup_list, max(args.hours), max(args.intervals), backend, False, 1)
+        run_get_positions(max(args.hours), max(args.intervals), backend)
+
+    results = []
+    for backend in args.backends:
+        for hours in args.hours:
+            for interval_minutes in args.intervals:
+                record = {"case": "get_positions", "n_sources": 1, "hours": hours,
+                          "interval_minutes": interval_minutes, "backend": backend}
+                record.update(measure(lambda: run_get_positions(hours, interval_minutes, backend),
+                                      args.repeat, not args.no_memory))
+                results.append(record)
+                print(f"get_positions      1 src {hours:>4} h {interval_minutes:>3} min {backend:<8} {record['total_s']:9.3f} s")
+
+                for n_sources in args.sources:
+                    src_list_file = write_synthetic_source_list(os.path.join(BENCH_DIR, f"src_{n_sources}.txt"), n_sources)
+                    record = {"case": "main", "n_sources": n_sources, "hours": hours,
+                              "interval_minutes": interval_minutes, "backend": backend}
+                    record.update(measure(lambda: run_main(src_list_file, hours, interval_minutes, backend,
+                                                           args.per_source_pdfs, args.workers),
+                                          args.repeat, not args.no_memory))
+                    results.append(record)
+                    print(f"main          {n_sources:>5} src {hours:>4} h {interval_minutes:>3} min {backend:<8} {record['total_s']:9.3f} s")
+
+    return results
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    pipeline.configure_iers()
+    os.makedirs(BENCH_DIR)
+    try:
+        results = run_benchmark(args)
+    finally:
+        shutil.rmtree(BENCH_DIR, ignore_errors=True)
+
+    output = {
+        "metadata": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "astropy": astropy.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "start_time_ist": START_TIME_IST,
+            "threshold_deg": THRESHOLD,
+            "seed": SEED,
+            "workers": args.workers,
+            "per_source_pdfs": args.per_source_pdfs,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(output, file, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
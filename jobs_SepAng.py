@@ -0,0 +1,81 @@
+"""In-process background job queue for the Streamlit app.
+
+Submissions run on a small thread pool owned by the server process, so a
+long source list no longer blocks the page and a rerun cannot abort it. Every
+job gets an id that the page keeps in its URL, which lets a refreshed or
+reopened tab reattach to the job and poll its progress and result.
+"""
+
+import os
+import time
+import uuid
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("inpta")
+
+# Concurrent jobs per server process (INPTA_JOB_WORKERS overrides); further submissions wait in the queue
+JOB_WORKERS = int(os.environ.get("INPTA_JOB_WORKERS", 2))
+# Finished jobs are forgotten after this many seconds
+JOB_RETENTION_SEC = 3600
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="inpta-job")
+_jobs = {}
+_lock = threading.Lock()
+
+
+def _update_job(job_id, **fields):
+    with _lock:
+        _jobs[job_id].update(fields)
+
+
+def _run_job(job_id, func, args, kwargs):
+    """Worker-thread body: run func with progress and publish callbacks bound to the job."""
+    def progress(stage, done, total):
+        _update_job(job_id, stage=stage, done=done, total=total)
+
+    def publish(partial):
+        _update_job(job_id, partial=partial)
+
+    _update_job(job_id, state='running', started=time.time())
+    try:
+        result = func(*args, progress=progress, publish=publish, **kwargs)
+    except Exception as e:
+        logger.error("Job %s failed:\n%s", job_id, traceback.format_exc())
+        _update_job(job_id, state='failed', error=str(e) or type(e).__name__, finished=time.time())
+    else:
+        _update_job(job_id, state='done', result=result, finished=time.time())
+
+
+def purge_jobs(max_age=JOB_RETENTION_SEC):
+    """Drop finished jobs older than max_age seconds."""
+    cutoff = time.time() - max_age
+    with _lock:
+        for job_id in [job_id for job_id, job in _jobs.items() if job.get('finished', cutoff + 1) < cutoff]:
+            del _jobs[job_id]
+
+
+def submit_job(func, *args, **kwargs):
+    """Queue func(*args, progress=..., publish=..., **kwargs) and return the new job id.
+
+    func receives a progress(stage, done, total) callback and a publish(partial)
+    callback to expose partial results while it runs; its return value becomes
+    the job result.
+    """
+    purge_jobs()
+    job_id = uuid.uuid4().hex
+    with _lock:
+        _jobs[job_id] = {'state': 'queued', 'stage': None, 'done': 0, 'total': 0,
+                         'partial': None, 'result': None, 'error': None, 'submitted': time.time()}
+    _executor.submit(_run_job, job_id, func, args, kwargs)
+    logger.info("Queued job %s", job_id)
+    return job_id
+
+
+def job_status(job_id):
+    """Snapshot of a job (state is one of queued/running/done/failed), or None for an unknown id."""
+    with _lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job is not None else None
@@ -2,16 +2,97 @@
 
 import sys
 import os
+import argparse
 import re
+import io
+import shutil
+import time
+import logging
+import threading
+import tempfile
+import subprocess
+import importlib
+import multiprocessing
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-import matplotlib.dates as mdates
-from matplotlib.ticker import MaxNLocator
 from astropy.time import Time
-from astropy.coordinates import get_sun, SkyCoord, EarthLocation, AltAz, Angle
+import astropy.units as u
+from astropy.coordinates import get_sun, get_body, SkyCoord, EarthLocation, AltAz, Angle, GCRS, FK4, FK5
+from astropy.utils import iers
+import astropy.utils.data
 from datetime import datetime, timedelta
-import pandas as pd
+from functools import partial, lru_cache
+from contextlib import nullcontext, contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+# matplotlib and pandas are imported by the functions that plot or build tables, see warm_up
+
+# Silent unless a handler is attached (enable_logging, or INPTA_LOG_LEVEL=DEBUG/INFO/...)
+logger = logging.getLogger("inpta")
+logger.addHandler(logging.NullHandler())
+
+# Earth-orientation and leap-second data (INPTA_IERS): 'bundled' only uses the tables shipped in the
+# pinned astropy-iers-data package and never goes to the network, 'auto' keeps astropy's downloads
+IERS_MODE = os.environ.get('INPTA_IERS', 'bundled')
+
+def configure_iers(mode=IERS_MODE):
+    """Select where astropy gets its IERS and leap-second tables, process-wide.
+
+    Importing this module leaves astropy's settings alone; the entry points
+    (the CLI, the app, the benchmark) call this with IERS_MODE.
+
+    In 'bundled' mode the shipped IERS-A table (with about a year of
+    predictions) and leap-second list are used as they are: no download is
+    attempted, their age is not checked, and astropy is not allowed on the
+    internet, so AltAz transforms never stall on air-gapped or serverless
+    hosts. Dates past the tables fall back to astropy's default Earth
+    orientation (with a warning), which only affects AltAz, and by far less
+    than the elevation limits in use.
+    """
+    if mode == 'bundled':
+        iers.conf.auto_download = False
+        iers.conf.auto_max_age = None
+        astropy.utils.data.conf.allow_internet = False
+    elif mode == 'auto':
+        for conf, name in ((iers.conf, 'auto_download'), (iers.conf, 'auto_max_age'), (astropy.utils.data.conf, 'allow_internet')):
+            conf.reset(name)
+    else:
+        raise ValueError(f"Unknown IERS mode {mode!r}, expected 'bundled' or 'auto'")
+
+# Stages reported by the built-in profiler, in pipeline order
+PIPELINE_STAGES = ['parsing', 'screening', 'ephemeris', 'transforms', 'separation', 'crossings', 'plotting', 'summary I/O']
+
+def enable_logging(level=logging.INFO):
+    """Send the pipeline's log records at `level` and above to stderr."""
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+
+if os.environ.get('INPTA_LOG_LEVEL'):
+    enable_logging(os.environ['INPTA_LOG_LEVEL'].upper())
+
+@contextmanager
+def timed_stage(name, timings=None):
+    """Time a pipeline stage, adding the elapsed seconds to timings[name] when a dict is given."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+        logger.debug("stage %s took %.4f s", name, elapsed)
+
+def format_stage_timings(timings):
+    """One line per stage with its time and share of the total, in pipeline order."""
+    total = sum(timings.values()) or 1.0
+    names = [name for name in PIPELINE_STAGES if name in timings] + [name for name in timings if name not in PIPELINE_STAGES]
+    return "\n".join(f"{name:<12} {timings[name]:9.4f} s  {100 * timings[name] / total:5.1f} %" for name in names)
+
+SUMMARY_PREAMBLE = (
+    "# This file contains the Summary of separtion angle between the sun and the sources during the observation time: \n"
+    "----------------------------------------------------------------------------------------- \n \n"
+)
 
 #
 def create_or_clear_directory(directory_path, filename_label):
@@ -24,9 +105,9 @@ def create_or_clear_directory(directory_path, filename_label):
                     os.unlink(file_path)
                 elif os.path.isdir(file_path):
                     shutil.rmtree(file_path)
-                    print(f"Deleted directory: {file_path}")  # Debugging statement
+                    logger.debug("Deleted directory: %s", file_path)
             except Exception as e:
-                print(f'Failed to delete {file_path}. Reason: {e}')
+                logger.warning("Failed to delete %s. Reason: %s", file_path, e)
     else:
         # If the directory does not exist, create it
         os.makedirs(directory_path)
@@ -34,8 +115,7 @@ def create_or_clear_directory(directory_path, filename_label):
     #freshly opening the summary file
     summaryfile = f'{directory_path}/summary_{filename_label}.txt'
     with open(summaryfile, 'w') as file:
-        file.write(f"# This file contains the Summary of separtion angle between the sun and the sources during the observation time: \n") 
-        file.write("----------------------------------------------------------------------------------------- \n \n")
+        file.write(SUMMARY_PREAMBLE)
    
     return summaryfile
                
@@ -47,110 +127,1254 @@ def generate_time_range(start_time, end_time, interval_minutes):
     """Generate a list of times from start to end at a given interval."""
     start = datetime.strptime(start_time, '%Y-%m-%d %H:%M:%S')
     end = datetime.strptime(end_time, '%Y-%m-%d %H:%M:%S')
-    print(f"start = {start}")
-    print(f"end = {end}")
+    logger.debug("start = %s, end = %s", start, end)
     times = [start + timedelta(minutes=i) for i in range(0, int((end - start).total_seconds() / 60) + 1, interval_minutes)]
-    print(f"times = {times}")
+    logger.debug("%d times generated at %d minute intervals", len(times), interval_minutes)
     return [t.strftime('%Y-%m-%d %H:%M:%S') for t in times]
 
-def sepang_calc(time, psr_coord):
- 
-    suncoord = get_sun(time)
-    print(suncoord)
+def sepang_calc(time, psr_coord, suncoord=None, backend='precise'):
+    """Separation angle (deg) between the Sun and the source; time may be an array-valued Time."""
+    if suncoord is None:
+        suncoord = sun_coord(time, backend)
     sep = suncoord.separation(psr_coord)
-    print(sep)
-    print(f'sepdeg = {sep.deg}')
-    print("\n")
 
     return sep.deg
-    
-def get_positions(times, gmrt_location, RA, DEC):
-    """Get the positions of the Sun and Pulsar for each timestamp."""
-    sun_positions = []
-    pulsar_positions = []
-    sep_ang = [] #new
-
-    for time in times:
-        formatted_time = Time(time, format='iso', scale='utc')
-        print(f"Formatted time = {formatted_time}")
-        # Get Sun's position
-        suncoord = get_sun(formatted_time)
-        sun_altaz = suncoord.transform_to(AltAz(obstime=formatted_time, location=gmrt_location))
-        
-        # Get Pulsar's position
-        pulsar_coord = SkyCoord(RA, DEC, frame='icrs')
-        pulsar_altaz = pulsar_coord.transform_to(AltAz(obstime=formatted_time, location=gmrt_location))
-        
-        # Store azimuth and altitude (to plot on sky map)
-        sun_positions.append((sun_altaz.az.deg, sun_altaz.alt.deg))
-        pulsar_positions.append((pulsar_altaz.az.deg, pulsar_altaz.alt.deg))
-        
-        #sep_ang.append(sepang_calc(time, RA, DEC))) #new
-        sep_ang.append(sepang_calc(formatted_time, pulsar_coord))
 
-    return np.array(sun_positions), np.array(pulsar_positions), np.array(sep_ang) #new
-    #return np.array(sun_positions), np.array(pulsar_positions)
-     
-# Function to plot the separation angle as a function of time
-def plot_separation_angle(times, output_folder, separation_angles, targetname, threshold, filename_label):
-    
-    # Convert times to datetime objects if they are not already in datetime format
-    times = pd.to_datetime(times) #this time is in utc
-    
-    # Add 5 hours and 30 minutes to convert to IST
-    times_ist = times + timedelta(hours=5, minutes=30)
+def fast_sun_radec(jd_tt):
+    """Low-precision geocentric Sun RA, Dec (rad) and distance (AU) for TT Julian dates.
 
-    # Extract the first date in DD-MM-YYYY format
-    first_date_ist = times_ist[0].strftime('%d-%m-%Y')
+    Closed-form solar coordinates of the Astronomical Almanac, with the ecliptic
+    longitude referred back to the J2000 equinox so that the result can be
+    compared with GCRS/ICRS directions. Against astropy's get_sun the direction
+    stays within FAST_SUN_TOLERANCE_ARCMIN (measured 0.7 arcmin for 1950-2050,
+    1.0 arcmin for 1900-2100) and the distance within 2e-4 AU.
+    """
+    n = np.asarray(jd_tt) - 2451545.0
+    mean_lon = 280.460 + 0.9856474 * n
+    mean_anomaly = np.radians(357.528 + 0.9856003 * n)
+    ecl_lon = mean_lon + 1.915 * np.sin(mean_anomaly) + 0.020 * np.sin(2 * mean_anomaly)
+    ecl_lon = np.radians(ecl_lon - 1.396971 * n / 36525.0)  # precession back to J2000
+    obliquity = np.radians(23.4392911)
 
-    #print(f"times = {times}")
-    #print(f"times[0] = {times[0]}")
-    
-    #print(f"times_ist = {times_ist}")
-    #print(f"times_ist[0] = {times_ist[0]}")
-    #sys.exit(1)
-    
-    #print(f"sepangles = {separation_angles}")
-    #print(f"sepangles[0] = {separation_angles[0]}")
-    #sys.exit(1)
-    
-    overlapflag = 0
-    colorcode = None
-    for sep in separation_angles: #looking for if at any point of time the separtion angle is smaller than the threshold
-        if sep < threshold:
-            overlapflag = 1
+    ra = np.arctan2(np.cos(obliquity) * np.sin(ecl_lon), np.cos(ecl_lon)) % (2 * np.pi)
+    dec = np.arcsin(np.sin(obliquity) * np.sin(ecl_lon))
+    distance = 1.00014 - 0.01671 * np.cos(mean_anomaly) - 0.00014 * np.cos(2 * mean_anomaly)
+
+    return ra, dec, distance
+
+def fast_get_sun(time):
+    """Drop-in replacement for get_sun built on fast_sun_radec (GCRS SkyCoord)."""
+    ra, dec, distance = fast_sun_radec(time.tt.jd)
+    return SkyCoord(ra=ra * u.rad, dec=dec * u.rad, distance=distance * u.au, frame=GCRS(obstime=time))
+
+# Selectable solar ephemeris backends: full astropy model or the closed-form formulae
+SUN_BACKENDS = {'precise': get_sun, 'fast': fast_get_sun}
+FAST_SUN_TOLERANCE_ARCMIN = 1.0
+
+# On-disk cache of daily Sun tables used by the 'precise' backend
+# (set INPTA_EPHEMERIS_CACHE to an empty string to disable it)
+EPHEMERIS_CACHE_DIR = os.environ.get('INPTA_EPHEMERIS_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'inpta_ephemeris'))
+EPHEMERIS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+EPHEMERIS_CACHE_STEP_SEC = 600
+# Largest difference (arcsec) between cached_get_sun and get_sun with the default step
+EPHEMERIS_CACHE_ERROR_ARCSEC = 1e-4
+
+def ephemeris_cache_path(mjd_day, cache_dir=EPHEMERIS_CACHE_DIR, step_sec=EPHEMERIS_CACHE_STEP_SEC):
+    """Deterministic file name of the Sun table for one UTC day (integer MJD)."""
+    day = Time(mjd_day, format='mjd', scale='utc').strftime('%Y%m%d')
+    return os.path.join(cache_dir, f"sun_precise_v2_{day}_{step_sec}s.npy")
+
+def evict_ephemeris_cache(cache_dir=EPHEMERIS_CACHE_DIR, max_bytes=EPHEMERIS_CACHE_MAX_BYTES):
+    """Delete least recently used Sun tables until the cache fits in max_bytes (run before adding one)."""
+    entries = []
+    for filename in os.listdir(cache_dir):
+        if filename.startswith('sun_') and filename.endswith('.npy'):
+            stat = os.stat(os.path.join(cache_dir, filename))
+            entries.append((stat.st_mtime, stat.st_size, filename))
+    total = sum(size for _, size, _ in entries)
+    for _, size, filename in sorted(entries):
+        if total <= max_bytes:
             break
-    
-    if overlapflag == 1:
-        colorcode = 'red'
+        os.unlink(os.path.join(cache_dir, filename))
+        total -= size
+
+def daily_sun_tables(mjd_days, cache_dir=EPHEMERIS_CACHE_DIR, step_sec=EPHEMERIS_CACHE_STEP_SEC):
+    """Memory-mapped (n, 4) tables of Sun unit vector and distance (AU), one per UTC day (integer MJD).
+
+    Rows are spaced step_sec apart from 00:00 to 24:00 UTC inclusive. Days that
+    are not cached yet are computed together with a single get_sun call and
+    written to disk; reading a table refreshes its mtime, which drives the LRU
+    eviction. Returns a dict mapping each day to its table.
+    """
+    tables = {}
+    missing = []
+    for day in mjd_days:
+        path = ephemeris_cache_path(day, cache_dir, step_sec)
+        if os.path.exists(path):
+            os.utime(path)
+            tables[day] = np.load(path, mmap_mode='r')
+        else:
+            missing.append(day)
+    if not missing:
+        return tables
+
+    os.makedirs(cache_dir, exist_ok=True)
+    evict_ephemeris_cache(cache_dir)
+    offsets = np.arange(0, 86400 + step_sec, step_sec)
+    # rows sit at fixed fractions of the UTC MJD, the same variable cached_get_sun interpolates in,
+    # so days with a leap second (86401 s) line up too
+    samples = Time(np.repeat(missing, len(offsets)).astype(float), np.tile(offsets / 86400.0, len(missing)), format='mjd', scale='utc')
+    suncoord = get_sun(samples)
+    values = np.column_stack((coord_unit_vectors(suncoord), suncoord.distance.au)).reshape(len(missing), len(offsets), 4)
+
+    for day, table in zip(missing, values):
+        path = ephemeris_cache_path(day, cache_dir, step_sec)
+        # write under a temporary name so concurrent readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            np.save(file, table)
+        os.replace(tmp_path, path)
+        tables[day] = np.load(path, mmap_mode='r')
+
+    return tables
+
+def cached_get_sun(time, cache_dir=EPHEMERIS_CACHE_DIR, step_sec=EPHEMERIS_CACHE_STEP_SEC):
+    """get_sun served from the daily on-disk tables by linear interpolation.
+
+    With ten-minute rows the interpolation error is below
+    EPHEMERIS_CACHE_ERROR_ARCSEC, so the result is interchangeable with
+    get_sun; dates already in the cache never touch the astropy ephemeris.
+    """
+    mjd = np.atleast_1d(time.utc.mjd)
+    days = np.floor(mjd).astype(int)
+    values = np.empty((len(mjd), 4))
+    tables = daily_sun_tables([int(day) for day in np.unique(days)], cache_dir, step_sec)
+    for day, table in tables.items():
+        sel = days == day
+        pos = (mjd[sel] - day) * 86400.0 / step_sec
+        idx = np.clip(np.floor(pos).astype(int), 0, len(table) - 2)
+        frac = (pos - idx)[:, None]
+        values[sel] = table[idx] * (1.0 - frac) + table[idx + 1] * frac
+
+    xyz = values[:, :3] / np.linalg.norm(values[:, :3], axis=1, keepdims=True)
+    ra = np.arctan2(xyz[:, 1], xyz[:, 0]) % (2 * np.pi)
+    dec = np.arcsin(xyz[:, 2])
+    distance = values[:, 3]
+    if time.isscalar:
+        ra, dec, distance = ra[0], dec[0], distance[0]
+
+    return SkyCoord(ra=ra * u.rad, dec=dec * u.rad, distance=distance * u.au, frame=GCRS(obstime=time))
+
+def sun_coord(time, backend='precise'):
+    """Sun position from the selected backend, through the on-disk cache when enabled."""
+    if backend == 'precise' and EPHEMERIS_CACHE_DIR:
+        try:
+            return cached_get_sun(time)
+        except OSError as e:
+            # read-only or full disk: fall back to computing directly
+            logger.warning("Ephemeris cache unavailable (%s), using get_sun directly", e)
+    return SUN_BACKENDS[backend](time)
+
+def batched_positions(obstimes, location, target_coord, backend='precise', timings=None, altaz=False):
+    """Sun and target AltAz tracks and their separation over an array-valued Time.
+
+    Every quantity is obtained from a single transform over the whole grid, so the
+    cost no longer scales with the number of astropy calls per timestamp.
+    Returns (sun_altaz, target_altaz, separation) where the AltAz arrays have
+    shape (n_times, 2) holding (az, alt) in degrees; they are only computed
+    when `altaz` is set and are None otherwise. `backend` names the solar
+    ephemeris in SUN_BACKENDS; stage times are added to `timings` if given.
+    """
+    with timed_stage('ephemeris', timings):
+        suncoord = sun_coord(obstimes, backend)
+
+    sun_positions = target_positions = None
+    if altaz:
+        altaz_frame = AltAz(obstime=obstimes, location=location)
+        with timed_stage('transforms', timings):
+            sun_altaz = suncoord.transform_to(altaz_frame)
+            target_altaz = target_coord.transform_to(altaz_frame)
+        sun_positions = np.column_stack((sun_altaz.az.deg, sun_altaz.alt.deg))
+        target_positions = np.column_stack((target_altaz.az.deg, target_altaz.alt.deg))
+
+    with timed_stage('separation', timings):
+        sep_ang = np.atleast_1d(sepang_calc(obstimes, target_coord, suncoord))
+
+    return sun_positions, target_positions, sep_ang
+
+def get_positions(times, gmrt_location, RA, DEC, backend='precise', timings=None, altaz=False):
+    """Get the separation of the Sun and Pulsar for each timestamp, and their AltAz positions if `altaz` is set."""
+    with timed_stage('parsing', timings):
+        formatted_times = Time(times, format='iso', scale='utc')
+    logger.debug("Formatted times = %s ... %s (%d samples)", formatted_times[0], formatted_times[-1], len(formatted_times))
+
+    # Get Pulsar's position (built once and broadcast against the time grid)
+    pulsar_coord = SkyCoord(RA, DEC, frame='icrs')
+
+    return batched_positions(formatted_times, gmrt_location, pulsar_coord, backend, timings, altaz)
+     
+def site_altitudes(obstimes, locations, target_coords, backend='precise', timings=None):
+    """Sun and source altitudes (deg) at several observatories over a shared time grid.
+
+    A single AltAz frame broadcasts the array-valued EarthLocation (n_sites)
+    against the time grid (n_times), so each body needs one transform for all
+    sites. Returns sun_alt with shape (n_sites, n_times) and target_alt with
+    shape (n_sites, n_sources, n_times).
+    """
+    altaz_frame = AltAz(obstime=obstimes[np.newaxis, :], location=locations[:, np.newaxis])
+
+    with timed_stage('ephemeris', timings):
+        suncoord = sun_coord(obstimes, backend)
+    with timed_stage('transforms', timings):
+        sun_alt = suncoord.transform_to(altaz_frame).alt.deg
+
+    return sun_alt, target_altitudes(obstimes, locations, target_coords, timings)
+
+def target_altitudes(obstimes, locations, target_coords, timings=None):
+    """Source altitudes (deg) with shape (n_sites, n_sources, n_times), one transform for all sites and sources."""
+    altaz_frame = AltAz(obstime=obstimes[np.newaxis, :], location=locations[:, np.newaxis])
+    with timed_stage('transforms', timings):
+        target_alt = target_coords[:, np.newaxis, np.newaxis].transform_to(altaz_frame).alt.deg
+
+    return np.moveaxis(target_alt, 0, 1)
+
+def unit_vectors(lon, lat):
+    """Cartesian unit vectors for longitude/latitude arrays given in radians."""
+    cos_lat = np.cos(lat)
+    return np.stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)), axis=-1)
+
+def coord_unit_vectors(coord):
+    """Unit vectors (n, 3) for the RA/Dec direction of a (scalar or array) coordinate."""
+    return unit_vectors(np.atleast_1d(coord.ra.rad), np.atleast_1d(coord.dec.rad))
+
+# Largest angle (deg) between a source's catalogue and apparent direction: the
+# annual aberration (20.5 arcsec) plus the Sun's light deflection at the limb
+APPARENT_SHIFT_DEG = 25.0 / 3600
+
+def apparent_unit_vectors(coords, obstimes):
+    """Unit vectors of the sources' apparent (GCRS) direction, the frame get_sun works in.
+
+    This adds the annual aberration and the Sun's light deflection to the
+    catalogue direction, as SkyCoord.separation does when it moves a source
+    into the Sun's frame. Both follow the Earth's orbit, ~1 deg/day, so a span
+    of up to a day is transformed once at its middle, shape (n, 3); longer
+    spans get one batched transform per day, shape (n, n_times, 3).
+    """
+    coords = coords.reshape((-1,))
+    span_days = (obstimes[-1] - obstimes[0]).to_value(u.day)
+    if span_days <= 1:
+        return coord_unit_vectors(coords.transform_to(GCRS(obstime=obstimes[0] + 0.5 * span_days * u.day)))
+    day = np.floor((obstimes - obstimes[0]).to_value(u.day)).astype(int)
+    epochs = obstimes[0] + (np.arange(day.max() + 1) + 0.5) * u.day
+    return coord_unit_vectors(coords[:, np.newaxis].transform_to(GCRS(obstime=epochs)))[:, day]
+
+def solar_unit_vectors(obstimes, backend='precise'):
+    """Unit vectors (n_times, 3) of the Sun's apparent direction over an array-valued Time."""
+    if backend == 'fast':
+        ra, dec, _ = fast_sun_radec(obstimes.tt.jd)
+        return unit_vectors(np.atleast_1d(ra), np.atleast_1d(dec))
+    return coord_unit_vectors(sun_coord(obstimes, backend))
+
+# Lowest elevation (deg) the GMRT antennas can point to
+GMRT_MIN_ELEVATION = 17.0
+
+# Solar-system bodies that can be checked besides the Sun (astropy's built-in ephemeris)
+PROXIMITY_BODIES = ('moon', 'mercury', 'venus', 'mars', 'jupiter', 'saturn')
+
+def body_unit_vectors(body, obstimes, backend='precise', location=None):
+    """Unit vectors (n_times, 3) of a solar-system body's apparent direction.
+
+    The Sun goes through solar_unit_vectors and the selected backend; other
+    bodies use get_body, topocentric when a single `location` is given (the
+    Moon's parallax reaches ~1 deg) and geocentric otherwise.
+    """
+    if body == 'sun':
+        return solar_unit_vectors(obstimes, backend)
+    if location is not None and location.shape:
+        location = None
+    return coord_unit_vectors(get_body(body, obstimes, location))
+
+# Largest Chebyshev fit error (arcsec) against its node provider before falling back to the provider itself
+CHEBYSHEV_ERROR_BOUND_ARCSEC = 1e-3
+
+def _chebyshev_basis(x, n_terms):
+    """Chebyshev polynomials T_0..T_{n_terms-1} evaluated at x in [-1, 1], shape (len(x), n_terms)."""
+    basis = np.empty((len(x), n_terms))
+    basis[:, 0] = 1.0
+    if n_terms > 1:
+        basis[:, 1] = x
+    for k in range(2, n_terms):
+        basis[:, k] = 2.0 * x * basis[:, k - 1] - basis[:, k - 2]
+    return basis
+
+def chebyshev_ephemeris(start_time, end_time, n_nodes=8, segment_hours=24, body_vectors=solar_unit_vectors):
+    """Piecewise Chebyshev interpolant of the Sun's (or another body's) direction between two times.
+
+    `body_vectors` maps a Time array to unit vectors, solar_unit_vectors by
+    default. The span is split into segments of `segment_hours`; it is evaluated only
+    at `n_nodes` Chebyshev nodes per segment (all segments in one batched call)
+    and the unit-vector components are interpolated from those nodes. Any number
+    of later samples, down to per-second grids, then cost a polynomial
+    evaluation instead of a full ephemeris call.
+
+    The fit is checked against `body_vectors` itself half-way between every
+    pair of nodes; the returned error is that of the interpolation alone. For
+    the 'precise' Sun, body_vectors reads the ephemeris cache, so against
+    get_sun the error is at most max_error_arcsec plus
+    EPHEMERIS_CACHE_ERROR_ARCSEC. With the defaults the measured fit error
+    is ~1e-5 arcsec over spans from hours to a year, far inside
+    CHEBYSHEV_ERROR_BOUND_ARCSEC.
+
+    Returns (ephemeris, max_error_arcsec) where ephemeris(obstimes) gives unit
+    vectors with shape (n_times, 3), like solar_unit_vectors.
+    """
+    span_sec = max((end_time - start_time).sec, 1.0)
+    n_segments = int(np.ceil(span_sec / (segment_hours * 3600.0)))
+    seg_sec = span_sec / n_segments
+
+    # Chebyshev nodes on [-1, 1] and their times in every segment
+    k = np.arange(n_nodes)
+    nodes = np.cos(np.pi * (k + 0.5) / n_nodes)
+    node_sec = (np.arange(n_segments)[:, None] + 0.5 * (nodes[None, :] + 1.0)) * seg_sec
+    node_xyz = body_vectors(start_time + node_sec.ravel() * u.s).reshape(n_segments, n_nodes, 3)
+
+    # Discrete Chebyshev transform of the node values (exact interpolation)
+    basis = _chebyshev_basis(nodes, n_nodes)
+    coeffs = np.einsum('nk,snc->skc', basis, node_xyz) * (2.0 / n_nodes)
+    coeffs[:, 0, :] *= 0.5
+
+    def ephemeris(obstimes):
+        t_sec = np.atleast_1d((obstimes - start_time).sec)
+        seg = np.clip((t_sec // seg_sec).astype(int), 0, n_segments - 1)
+        x = 2.0 * (t_sec - seg * seg_sec) / seg_sec - 1.0
+        xyz = np.einsum('tk,tkc->tc', _chebyshev_basis(x, n_nodes), coeffs[seg])
+        return xyz / np.linalg.norm(xyz, axis=1, keepdims=True)
+
+    # Check the interpolant half-way between neighbouring nodes against the direct evaluation
+    check_sec = np.sort(node_sec, axis=1)
+    check_sec = (0.5 * (check_sec[:, 1:] + check_sec[:, :-1])).ravel()
+    check_times = start_time + check_sec * u.s
+    chord = np.linalg.norm(ephemeris(check_times) - body_vectors(check_times), axis=1)
+    max_error_arcsec = np.degrees(2.0 * np.arcsin(0.5 * chord).max()) * 3600.0
+
+    return ephemeris, max_error_arcsec
+
+def session_sun_ephemeris(obstimes, backend='precise'):
+    """Sun unit-vector provider covering obstimes for the selected backend."""
+    if backend == 'fast':
+        # closed-form formulae are already cheaper than building an interpolant
+        return partial(solar_unit_vectors, backend='fast')
+
+    sun_ephemeris, max_error_arcsec = chebyshev_ephemeris(obstimes[0], obstimes[-1])
+    if max_error_arcsec > CHEBYSHEV_ERROR_BOUND_ARCSEC:
+        logger.warning("Chebyshev Sun ephemeris error %s arcsec exceeds the bound, using the %s backend directly", max_error_arcsec, backend)
+        return solar_unit_vectors
+    return sun_ephemeris
+
+def session_body_ephemeris(obstimes, body, location=None):
+    """Unit-vector provider of a body other than the Sun covering obstimes.
+
+    Shorter segments than for the Sun keep the topocentric Moon (with its
+    diurnal parallax) inside CHEBYSHEV_ERROR_BOUND_ARCSEC.
+    """
+    body_vectors = partial(body_unit_vectors, body, location=location)
+    body_ephemeris, max_error_arcsec = chebyshev_ephemeris(obstimes[0], obstimes[-1], segment_hours=6, body_vectors=body_vectors)
+    if max_error_arcsec > CHEBYSHEV_ERROR_BOUND_ARCSEC:
+        logger.warning("Chebyshev %s ephemeris error %s arcsec exceeds the bound, using get_body directly", body, max_error_arcsec)
+        return body_vectors
+    return body_ephemeris
+
+def separation_matrix(sun_xyz, target_xyz):
+    """Separation angles (deg) between every source and the Sun at every timestamp.
+
+    The Sun track is computed once by the caller and shared by all sources, so the
+    only per-source cost is a dot product between unit vectors. The result has
+    shape (n_sources, n_times). target_xyz comes from apparent_unit_vectors,
+    (n_sources, 3) or one vector per sample (n_sources, n_times, 3), so the
+    angles match SkyCoord.separation against get_sun.
+    """
+    if target_xyz.ndim == 3:
+        cos_sep = np.clip(np.einsum('stc,tc->st', target_xyz, sun_xyz), -1.0, 1.0)
     else:
-        colorcode = 'blue'
-        
-    fig, ax = plt.subplots(figsize=(8, 6))
-    #ax.plot(times, separation_angles, label='Separation Angle', color=colorcode)
-    ax.plot(times_ist, separation_angles, label='Separation Angle', color=colorcode)
-    #print(f"times = {times}")
-    #print(f"length of times = {len(times)}")
-    #ax.set(xlabel='Time (UTC)', ylabel='Separation Angle (degrees)', title=f'Sun-Pulsar Separation Angle Timeseries - {targetname}')
-    ax.set(xlabel='Time (IST)', ylabel='Separation Angle (degrees)', title=f'Sun-Pulsar Separation Angle Timeseries - {targetname} [{first_date_ist}]')
-    
-    # Set x-axis major locator to hourly intervals and formatter
-    ax.xaxis.set_major_locator(mdates.HourLocator(interval=1))  # Ticks every 1 hour
+        cos_sep = np.clip(target_xyz @ sun_xyz.T, -1.0, 1.0)
+
+    return np.degrees(np.arccos(cos_sep))
+
+def find_threshold_crossings(obstimes, sep_matrix, target_xyz, threshold, tolerance_sec=0.5, sun_ephemeris=solar_unit_vectors):
+    """Exact intervals during which each source is within `threshold` degrees of the Sun.
+
+    Sign changes of (separation - threshold) between neighbouring samples of the
+    coarse grid bracket every crossing; all brackets of all sources are then
+    refined together by bisection, one batched Sun evaluation per iteration,
+    until they are narrower than `tolerance_sec`. target_xyz is the one
+    separation_matrix was given. `sun_ephemeris` maps a Time
+    array to Sun unit vectors (e.g. a chebyshev_ephemeris), or to those of any other body. A dip that starts and ends
+    between two grid samples is not bracketed, which for the Sun's ~1 deg/day
+    motion only matters for grazing passes.
+
+    Returns one list per source of (enter, exit) Time pairs; intervals already
+    open at the first sample or still open at the last one are clipped to the
+    session boundaries.
+    """
+    t_sec = (obstimes - obstimes[0]).sec
+    inside = sep_matrix <= threshold
+
+    src_idx, t_idx = np.nonzero(inside[:, :-1] != inside[:, 1:])
+    lo = t_sec[t_idx]
+    hi = t_sec[t_idx + 1]
+    inside_lo = inside[src_idx, t_idx]
+    bracket_xyz = target_xyz[src_idx] if target_xyz.ndim == 2 else target_xyz[src_idx, t_idx]
+
+    while len(lo) and np.max(hi - lo) > tolerance_sec:
+        mid = 0.5 * (lo + hi)
+        sun_xyz = sun_ephemeris(obstimes[0] + mid * u.s)
+        cos_sep = np.clip(np.sum(bracket_xyz * sun_xyz, axis=1), -1.0, 1.0)
+        inside_mid = np.degrees(np.arccos(cos_sep)) <= threshold
+        move_lo = inside_mid == inside_lo
+        lo = np.where(move_lo, mid, lo)
+        hi = np.where(move_lo, hi, mid)
+
+    crossing_sec = 0.5 * (lo + hi)
+
+    return _crossing_intervals(obstimes, t_sec, inside, src_idx, crossing_sec, inside_lo)
+
+def _crossing_intervals(obstimes, t_sec, inside, src_idx, crossing_sec, inside_lo):
+    """Per-source (enter, exit) Time pairs from refined crossings, clipped to the grid ends."""
+    intervals = []
+    for i in range(inside.shape[0]):
+        bounds = []
+        enter = t_sec[0] if inside[i, 0] else None
+        for t_cross, was_inside in zip(crossing_sec[src_idx == i], inside_lo[src_idx == i]):
+            if was_inside:
+                bounds.append((enter, t_cross))
+                enter = None
+            else:
+                enter = t_cross
+        if enter is not None:
+            bounds.append((enter, t_sec[-1]))
+        intervals.append([(obstimes[0] + a * u.s, obstimes[0] + b * u.s) for a, b in bounds])
+
+    return intervals
+
+def find_elevation_windows(obstimes, target_alt, target_coords, location, min_elevation, refine_passes=2):
+    """Intervals during which each source is at or above `min_elevation` degrees at `location`.
+
+    Rises and sets are bracketed on the grid of altitudes target_alt
+    (n_sources, n_times) and refined by regula falsi: every pass evaluates
+    all brackets at their linear estimate in one batched AltAz transform.
+    Altitude is close to linear over a grid step, so two passes bring the
+    error well under a second for 10 minute grids. Returns one list per
+    source of (rise, set) Time pairs, clipped to the session like
+    find_threshold_crossings.
+    """
+    t_sec = (obstimes - obstimes[0]).sec
+    above = target_alt >= min_elevation
+
+    src_idx, t_idx = np.nonzero(above[:, :-1] != above[:, 1:])
+    lo, hi = t_sec[t_idx], t_sec[t_idx + 1]
+    f_lo = target_alt[src_idx, t_idx] - min_elevation
+    f_hi = target_alt[src_idx, t_idx + 1] - min_elevation
+
+    for _ in range(refine_passes if len(lo) else 0):
+        estimate = lo - f_lo * (hi - lo) / (f_hi - f_lo)
+        altaz_frame = AltAz(obstime=obstimes[0] + estimate * u.s, location=location)
+        f_mid = target_coords[src_idx].transform_to(altaz_frame).alt.deg - min_elevation
+        move_lo = (f_mid >= 0) == (f_lo >= 0)
+        lo, f_lo = np.where(move_lo, estimate, lo), np.where(move_lo, f_mid, f_lo)
+        hi, f_hi = np.where(move_lo, hi, estimate), np.where(move_lo, f_hi, f_mid)
+
+    crossing_sec = lo - f_lo * (hi - lo) / (f_hi - f_lo)
+
+    return _crossing_intervals(obstimes, t_sec, above, src_idx, crossing_sec, above[src_idx, t_idx])
+
+def intersect_intervals(intervals, windows):
+    """Parts of the sorted (start, end) Time pairs in `intervals` that fall inside the sorted `windows`."""
+    overlaps = []
+    i = j = 0
+    while i < len(intervals) and j < len(windows):
+        start = max(intervals[i][0], windows[j][0])
+        end = min(intervals[i][1], windows[j][1])
+        if start < end:
+            overlaps.append((start, end))
+        if intervals[i][1] < windows[j][1]:
+            i += 1
+        else:
+            j += 1
+
+    return overlaps
+
+# Fast paths for the angle formats found in observation command files;
+# anything else falls back to astropy's full Angle parser
+_SEXAGESIMAL_ANGLE = re.compile(r"""^([+-]?)(\d+)([hd:])(\d+)[m:'](\d+(?:\.\d*)?)[s"]?$""", re.IGNORECASE)
+_DECIMAL_ANGLE = re.compile(r"^([+-]?(?:\d+\.?\d*|\.\d+))([hd]?)$", re.IGNORECASE)
+
+# Epoch column values and the frame the coordinates are referred to
+SOURCE_EPOCHS = {'2000': 'J2000', '2000.0': 'J2000', 'J2000': 'J2000', '1950': 'B1950', '1950.0': 'B1950', 'B1950': 'B1950'}
+
+# Side of the catalog_index cells, as the angle (deg) between unit vectors one cell apart
+CATALOG_CELL_DEG = 5.0
+
+def _cell_ijk(xyz, cell):
+    return np.floor((xyz + 1.0) / cell).astype(np.int64)
+
+def catalog_index(target_coords, cell_deg=CATALOG_CELL_DEG):
+    """Spatial index of a source catalog for sources_near_track, built once per catalog.
+
+    The source unit vectors are binned into cubic cells of side
+    2 sin(cell_deg / 2) and sorted by cell, so a query only visits the cells
+    around a track instead of the whole catalog.
+    """
+    xyz = coord_unit_vectors(target_coords)
+    cell = 2 * np.sin(np.radians(cell_deg) / 2)
+    n_cells = int(np.ceil(2.0 / cell)) + 1
+    ijk = _cell_ijk(xyz, cell)
+    keys = (ijk[:, 0] * n_cells + ijk[:, 1]) * n_cells + ijk[:, 2]
+    order = np.argsort(keys, kind='stable')
+    return {'coords': target_coords, 'xyz': xyz, 'cell': cell, 'n_cells': n_cells, 'keys': keys[order], 'order': order}
+
+def sources_near_track(index, track_xyz, threshold, obstimes=None):
+    """Sorted indices of the catalog sources within `threshold` (deg) of any sample of a (n_times, 3) track.
+
+    Only the sources in the cells within reach of the track cells are
+    compared with the track, with separation_matrix, so the cost follows the
+    number of sources near the track rather than the size of the catalog.
+    With the track's `obstimes` the comparison uses the candidates'
+    apparent_unit_vectors, like session_separations; the cells are binned by
+    catalogue direction, so their reach then allows for APPARENT_SHIFT_DEG.
+    """
+    cell, n_cells = index['cell'], index['n_cells']
+    reach_deg = threshold if obstimes is None else threshold + APPARENT_SHIFT_DEG
+    reach = int(np.ceil(2 * np.sin(np.radians(min(reach_deg, 180.0)) / 2) / cell))
+    offsets = np.stack(np.meshgrid(*[np.arange(-reach, reach + 1)] * 3, indexing='ij'), axis=-1).reshape(-1, 3)
+    track_cells = np.unique(_cell_ijk(track_xyz, cell), axis=0)
+    cells = np.unique((track_cells[:, np.newaxis, :] + offsets).reshape(-1, 3), axis=0)
+    cells = cells[((cells >= 0) & (cells < n_cells)).all(axis=1)]
+    keys = (cells[:, 0] * n_cells + cells[:, 1]) * n_cells + cells[:, 2]
+
+    lo = np.searchsorted(index['keys'], keys, side='left')
+    counts = np.searchsorted(index['keys'], keys, side='right') - lo
+    # concatenated ranges lo[k]:lo[k] + counts[k] of the sorted catalog
+    rows = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    candidates = index['order'][rows]
+    if obstimes is None:
+        candidate_xyz = index['xyz'][candidates]
+    else:
+        candidate_xyz = apparent_unit_vectors(index['coords'][candidates], obstimes)
+    near = separation_matrix(track_xyz, candidate_xyz).min(axis=1) <= threshold
+
+    return np.sort(candidates[near])
+
+def angle_to_deg(strngval, is_ra):
+    """Parse one RA or Dec string into degrees, raising ValueError if it is malformed or out of range.
+
+    Sexagesimal values use h/d/: and m/'/: and s/" separators; colon-separated
+    RA is read as hours, colon-separated Dec as degrees. Plain numbers are
+    degrees unless suffixed with 'h'.
+    """
+    match = _SEXAGESIMAL_ANGLE.match(strngval)
+    if match:
+        sign, whole, unit, minutes, seconds = match.groups()
+        if int(minutes) >= 60 or float(seconds) >= 60:
+            raise ValueError(f"minutes/seconds out of range in {strngval!r}")
+        value = int(whole) + int(minutes) / 60.0 + float(seconds) / 3600.0
+        if unit.lower() == 'h' or (unit == ':' and is_ra):
+            value *= 15.0
+        value = -value if sign == '-' else value
+    else:
+        match = _DECIMAL_ANGLE.match(strngval)
+        if match:
+            value = float(match.group(1)) * (15.0 if match.group(2).lower() == 'h' else 1.0)
+        else:
+            try:
+                value = Angle(strngval).deg
+            except Exception as e:
+                raise ValueError(f"cannot parse angle {strngval!r}: {e}")
+
+    if is_ra and not 0.0 <= value < 360.0:
+        raise ValueError(f"RA {strngval!r} outside 0-24h")
+    if not is_ra and not -90.0 <= value <= 90.0:
+        raise ValueError(f"Dec {strngval!r} outside -90 to +90 deg")
+    return value
+
+def parse_source_list(text):
+    """Parse a whole source list in one pass without exiting on bad lines.
+
+    Columns are Source, RA, Dec and an optional Epoch (J2000/2000.0 or
+    B1950/1950.0, default J2000); extra columns are ignored, as are blank lines
+    and anything after '#'. All sources end up in one ICRS SkyCoord, with each
+    epoch converted by a single batched frame transform.
+
+    Returns (target_names, ra_strings, dec_strings, target_coords, errors) where
+    errors is a list of {'line', 'text', 'error'} dicts for the skipped lines.
+    """
+    target_names = []
+    ra_strings = []
+    dec_strings = []
+    ra_deg = []
+    dec_deg = []
+    epochs = []
+    errors = []
+
+    for lineno, line in enumerate(text.splitlines(), start=1):
+        content = line.split('#', 1)[0].strip()
+        if not content:
+            continue
+        row = re.split(r'\s+', content)  # Split by any amount of whitespace
+        try:
+            if len(row) < 3:
+                raise ValueError("expected at least Source, RA and Dec columns")
+            epoch = SOURCE_EPOCHS.get(row[3].upper() if len(row) > 3 else 'J2000')
+            if epoch is None:
+                raise ValueError(f"unknown epoch {row[3]!r} (use J2000/2000.0 or B1950/1950.0)")
+            ra = angle_to_deg(row[1], is_ra=True)
+            dec = angle_to_deg(row[2], is_ra=False)
+        except ValueError as e:
+            logger.warning("Skipping line %d of the source list: %s", lineno, e)
+            errors.append({'line': lineno, 'text': line.rstrip(), 'error': str(e)})
+            continue
+
+        target_names.append(row[0])
+        ra_strings.append(row[1])
+        dec_strings.append(row[2])
+        ra_deg.append(ra)
+        dec_deg.append(dec)
+        epochs.append(epoch)
+
+    ra_deg = np.array(ra_deg)
+    dec_deg = np.array(dec_deg)
+    epochs = np.array(epochs)
+    for epoch, frame in (('J2000', FK5(equinox='J2000')), ('B1950', FK4(equinox='B1950', obstime='B1950'))):
+        sel = epochs == epoch
+        if sel.any():
+            icrs = SkyCoord(ra=ra_deg[sel] * u.deg, dec=dec_deg[sel] * u.deg, frame=frame).icrs
+            ra_deg[sel] = icrs.ra.deg
+            dec_deg[sel] = icrs.dec.deg
+    target_coords = SkyCoord(ra=ra_deg * u.deg, dec=dec_deg * u.deg, frame='icrs')
+
+    return target_names, ra_strings, dec_strings, target_coords, errors
+
+def format_parse_errors(errors):
+    """Summary-file block listing the source list lines that were skipped."""
+    lines = ["# Skipped source list lines: \n"]
+    for error in errors:
+        lines.append(f"#   line {error['line']}: {error['text']}    ({error['error']}) \n")
+    lines.append("\n")
+    return "".join(lines)
+
+def read_source_list(src_list_file):
+    """Read and parse a source list file; see parse_source_list."""
+    with open(src_list_file, 'r') as file:
+        return parse_source_list(file.read())
+
+# Line colours of the bodies other than the Sun in the separation plots
+BODY_COLOURS = {'moon': 'grey', 'mercury': 'tab:brown', 'venus': 'tab:orange', 'mars': 'tab:pink', 'jupiter': 'tab:purple', 'saturn': 'tab:olive'}
+
+def iter_separation_pages(times, sep_matrix, target_names, threshold, filename_label, per_source_files=True, pdf=None, body_series=(), visibility=None):
+    """Render the separation timeseries of each source in turn, yielding its {file name: PDF bytes}.
+
+    A single Figure/Axes is created and only the line data, colour and title
+    are updated per source, so memory stays bounded regardless of the number
+    of sources. Each page is also appended to `pdf` (an open PdfPages) when
+    given; the yielded dict is empty when per_source_files is off. The figure
+    is built without pyplot so pages can be rendered from several threads.
+
+    `body_series` holds (body, sep_matrix, threshold) of other solar-system
+    bodies, drawn as dashed lines that thicken where the source violates
+    that body's threshold. `visibility` = (min_elevation, alt_matrix) shades
+    the times when the source is below the elevation limit, and only
+    violations outside them turn the plot red.
+    """
+    import matplotlib.dates as mdates
+    from matplotlib.figure import Figure
+    from matplotlib.ticker import MaxNLocator
+    import pandas as pd
+    times_ist = pd.to_datetime(times) + timedelta(hours=5, minutes=30)
+    first_date_ist = times_ist[0].strftime('%d-%m-%Y')
+
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    line, = ax.plot(times_ist, sep_matrix[0], label='Sun' if body_series else 'Separation Angle')
+    body_lines = [ax.plot(times_ist, body_matrix[0], linestyle='--', color=BODY_COLOURS.get(body))[0]
+                  for body, body_matrix, _ in body_series]
+    ax.set(xlabel='Time (IST)', ylabel='Separation Angle (degrees)')
     ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))  # Format as Hour-Minute
-    
-    # Use MaxNLocator to limit the number of ticks
     ax.xaxis.set_major_locator(MaxNLocator(nbins=9))  # Limit the number of ticks to a reasonable value
-    
-    
-    #plt.xticks(rotation=45)
-    plt.grid(True)
-    plt.tight_layout()
-    
-    figname = f"{output_folder}/{targetname}_SeparationAngle_vs_time_{filename_label}.pdf"
-    #Save to file (pdf or jpeg)
-    plt.savefig(figname, format='pdf')  # You can change the format here
-    
-    #plt.close(fig)
+    ax.grid(True)
+    # lay out with a title in place so the per-source titles are not clipped
+    ax.set_title(f'Sun-Pulsar Separation Angle Timeseries - {target_names[0]} [{first_date_ist}]')
+    fig.tight_layout()
+
+    shade = None
+    for i, (targetname, separation_angles) in enumerate(zip(target_names, sep_matrix)):
+        observable = True
+        if visibility is not None:
+            min_elevation, alt_matrix = visibility
+            observable = alt_matrix[i] >= min_elevation
+            if shade is not None:
+                shade.remove()
+            shade = ax.fill_between(times_ist, 0, 1, where=~observable, transform=ax.get_xaxis_transform(),
+                                    color='grey', alpha=0.2, linewidth=0)
+        #red if at any point of time the separation angle is smaller than the threshold
+        line.set_ydata(separation_angles)
+        line.set_color('red' if np.any((separation_angles < threshold) & observable) else 'blue')
+        for body_line, (body, body_matrix, body_threshold) in zip(body_lines, body_series):
+            violates = np.any((body_matrix[i] < body_threshold) & observable)
+            body_line.set_ydata(body_matrix[i])
+            body_line.set_linewidth(2.5 if violates else 1.0)
+            body_line.set_label(f"{body.capitalize()}{f' (< {body_threshold} deg)' if violates else ''}")
+        if body_series:
+            ax.legend(loc='best')
+        ax.set_title(f'Sun-Pulsar Separation Angle Timeseries - {targetname} [{first_date_ist}]')
+        ax.relim()
+        ax.autoscale_view()
+
+        files = {}
+        if pdf is not None:
+            pdf.savefig(fig)
+        if per_source_files:
+            page = io.BytesIO()
+            fig.savefig(page, format='pdf')
+            files[f"{targetname}_SeparationAngle_vs_time_{filename_label}.pdf"] = page.getvalue()
+        yield files
+
+# Sky-map animation formats: gif through Pillow, mp4 needs ffmpeg on the PATH
+ANIMATION_FORMATS = ('gif', 'mp4')
+
+def sky_tracks(obstimes, location, target_coords, backend='precise', timings=None):
+    """Azimuth and altitude (deg) of the Sun, shape (n_times), and of every source, shape (n_sources, n_times).
+
+    Both bodies go through a single batched AltAz transform over the whole grid.
+    """
+    altaz_frame = AltAz(obstime=obstimes, location=location)
+    with timed_stage('ephemeris', timings):
+        suncoord = sun_coord(obstimes, backend)
+    with timed_stage('transforms', timings):
+        sun_altaz = suncoord.transform_to(altaz_frame)
+        target_altaz = target_coords[:, np.newaxis].transform_to(altaz_frame)
+
+    return sun_altaz.az.deg, sun_altaz.alt.deg, target_altaz.az.deg, target_altaz.alt.deg
+
+def _sky_polar(az, alt):
+    """Polar plot coordinates (theta, zenith distance) with points below the horizon masked out."""
+    return np.radians(az), np.where(alt >= 0, 90.0 - alt, np.nan)
+
+def _sky_frame_writer(fmt, size, fps, colours=()):
+    """Frame sink for render_sky_animation: returns (write(rgba), finish() -> bytes).
+
+    GIF frames share one palette, built from the first frame plus swatches of
+    the animated `colours`, instead of quantising every frame from scratch.
+    """
+    import matplotlib
+    width, height = size
+    if fmt == 'gif':
+        from PIL import Image
+        frames = []
+        palette = []
+
+        def write(rgba):
+            if not palette:
+                swatches = np.repeat(np.array([matplotlib.colors.to_rgba_array(colours) * 255], dtype=np.uint8), 8, axis=0)
+                sample = np.concatenate((rgba[:8, :len(colours)], swatches), axis=0) if len(colours) else rgba[:8]
+                palette.append(Image.fromarray(np.concatenate((rgba, np.pad(sample, ((0, 0), (0, width - sample.shape[1]), (0, 0)), mode='edge')))[..., :3])
+                               .quantize(colors=255, method=Image.Quantize.FASTOCTREE))
+            frames.append(Image.fromarray(rgba[..., :3]).quantize(palette=palette[0], dither=Image.Dither.NONE))
+
+        def finish():
+            buffer = io.BytesIO()
+            frames[0].save(buffer, format='GIF', save_all=True, append_images=frames[1:], duration=int(1000 / fps), loop=0)
+            return buffer.getvalue()
+
+        return write, finish
+
+    if fmt == 'mp4':
+        ffmpeg = shutil.which(matplotlib.rcParams['animation.ffmpeg_path'])
+        if ffmpeg is None:
+            raise ValueError("The mp4 sky-map animation needs ffmpeg on the PATH")
+        workdir = tempfile.TemporaryDirectory(prefix="inpta_anim_")
+        moviefile = os.path.join(workdir.name, "skymap.mp4")
+        # raw frames are streamed to ffmpeg, so memory does not grow with the number of frames
+        proc = subprocess.Popen(
+            [ffmpeg, '-loglevel', 'error', '-y', '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f"{width}x{height}",
+             '-r', str(fps), '-i', '-', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-vcodec', 'libx264',
+             '-pix_fmt', 'yuv420p', moviefile],
+            stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        def write(rgba):
+            proc.stdin.write(rgba.tobytes())
+
+        def finish():
+            with workdir:
+                _, err = proc.communicate()
+                if proc.returncode:
+                    raise RuntimeError(f"ffmpeg failed: {err.decode(errors='replace')}")
+                with open(moviefile, 'rb') as file:
+                    return file.read()
+
+        return write, finish
+
+    raise ValueError(f"Unknown animation format {fmt!r}, expected one of {', '.join(ANIMATION_FORMATS)}")
+
+def render_sky_animation(times, sun_az, sun_alt, target_az, target_alt, sep_matrix, target_names, threshold, fmt='gif', fps=8, dpi=100, min_elevation=None):
+    """Animated sky map of the Sun and every source over the session, returned as GIF or MP4 bytes.
+
+    The full tracks, source names and horizon/elevation-limit shading are
+    drawn once into a cached background; every frame only restores it and
+    blits the moving Sun, source markers (red while within `threshold` of
+    the Sun) and clock on the same figure, from the precomputed sky_tracks
+    arrays. One frame per sample of `times`, shown in IST.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import pandas as pd
+    times_ist = pd.to_datetime(times) + timedelta(hours=5, minutes=30)
+    sun_theta, sun_r = _sky_polar(sun_az, sun_alt)
+    target_theta, target_r = _sky_polar(target_az, target_alt)
+    near_sun = sep_matrix <= threshold
+
+    fig = Figure(figsize=(6.5, 6.5), dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot(projection='polar')
+    ax.set_theta_zero_location('N')
+    ax.set_theta_direction(-1)
+    ax.set_rlim(0, 90)
+    ax.set_rticks([15, 30, 45, 60, 75, 90])
+    ax.set_yticklabels(['75', '60', '45', '30', '15', '0'], fontsize=7)
+    ax.set_title(f'Sun and source tracks [{times_ist[0].strftime("%d-%m-%Y")}]')
+    if min_elevation is not None:
+        ax.fill_between(np.linspace(0, 2 * np.pi, 361), 90.0 - min_elevation, 90.0, color='grey', alpha=0.15, linewidth=0)
+
+    # static background: the whole tracks, drawn once
+    for targetname, theta, r in zip(target_names, target_theta, target_r):
+        ax.plot(theta, r, color='tab:blue', alpha=0.25, linewidth=0.8)
+        visible = np.flatnonzero(np.isfinite(r))
+        if len(visible):
+            ax.text(theta[visible[0]], r[visible[0]], targetname, fontsize=6, alpha=0.6)
+    ax.plot(sun_theta, sun_r, color='orange', alpha=0.5, linestyle='--', linewidth=1.0)
+
+    sources = ax.scatter(target_theta[:, 0], target_r[:, 0], s=18, zorder=3, animated=True)
+    sun, = ax.plot([], [], 'o', color='gold', markeredgecolor='orange', markersize=14, zorder=4, animated=True)
+    clock = ax.text(0.02, 0.02, '', transform=fig.transFigure, fontsize=9, animated=True)
+
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
+    write, finish = _sky_frame_writer(fmt, canvas.get_width_height(), fps, colours=['red', 'tab:blue', 'gold', 'orange'])
+
+    for k in range(len(times)):
+        canvas.restore_region(background)
+        sources.set_offsets(np.column_stack((target_theta[:, k], target_r[:, k])))
+        sources.set_facecolor(np.where(near_sun[:, k], 'red', 'tab:blue'))
+        sun.set_data([sun_theta[k]], [sun_r[k]])
+        clock.set_text(f"{times_ist[k].strftime('%H:%M')} IST")
+        for artist in (sources, sun, clock):
+            fig.draw_artist(artist)
+        write(np.asarray(canvas.buffer_rgba()))
+
+    return finish()
+
+def sky_animation(times, location, target_names, target_coords, sep_matrix, threshold, filename_label, fmt='gif', backend='precise', timings=None, min_elevation=None):
+    """Sky-map animation of one session as a {file name: bytes} dict, see render_sky_animation."""
+    tracks = sky_tracks(Time(times), location, target_coords, backend, timings)
+    with timed_stage('plotting', timings):
+        movie = render_sky_animation(times, *tracks, sep_matrix, target_names, threshold, fmt=fmt, min_elevation=min_elevation)
+    return {f"SkyMap_{filename_label}.{fmt}": movie}
+
+def write_outputs(outputs, output_folder):
+    """Write a {file name: bytes} dict of rendered outputs into output_folder."""
+    for filename, data in outputs.items():
+        with open(os.path.join(output_folder, filename), 'wb') as file:
+            file.write(data)
+
+def _proximity_lines(target_name, times, sep_ang_series, intervals, threshold, visibility=None):
+    observable = None
+    if visibility is not None:
+        min_elevation, alt_series, windows = visibility
+        observable = alt_series >= min_elevation
+        intervals = intersect_intervals(intervals, windows)
+    lines = ["Source          Enter (UTC)                    Exit (UTC) \n"]
+    for enter, exit in intervals:
+        lines.append(f"{target_name}        {enter.iso}        {exit.iso} \n")
+    lines.append("\n")
+    lines.append("Source          Obs Time                   Separation Angle \n")
+    for k, (t, s) in enumerate(zip(times, sep_ang_series)):
+        if s <= threshold and (observable is None or observable[k]):
+            lines.append(f"{target_name}        {t}        {s} \n")
+    return lines
+
+def summary_block(target_name, ra_str, dec_str, times, sep_ang_series, intervals, threshold, bodies=(), visibility=None):
+    """Text of one source's block in the summary file.
+
+    `bodies` holds (body, sep_ang_series, intervals, threshold) of every other
+    solar-system body checked, reported after the Sun. `visibility`, when
+    given as (min_elevation, alt_series, windows), lists the windows above
+    the elevation limit and restricts every violation to them.
+    """
+    lines = [
+        "----------------------------------------------------------------------------------------- \n",
+        f"{target_name}        {ra_str}        {dec_str} \n",
+        "----------------------------------------------------------------------------------------- \n",
+    ]
+    if visibility is not None:
+        min_elevation, _, windows = visibility
+        lines.append(f"Above {min_elevation} degrees elevation (violations below are only reported inside these windows): \n")
+        lines.append("Source          Rise (UTC)                     Set (UTC) \n")
+        for rise, set_ in windows:
+            lines.append(f"{target_name}        {rise.iso}        {set_.iso} \n")
+        lines.append("\n")
+    lines += _proximity_lines(target_name, times, sep_ang_series, intervals, threshold, visibility)
+    for body, body_series, body_intervals, body_threshold in bodies:
+        lines.append("\n")
+        lines.append(f"{body.capitalize()} proximity (threshold {body_threshold} degrees): \n")
+        lines += _proximity_lines(target_name, times, body_series, body_intervals, body_threshold, visibility)
+    lines.append("############################################################################################# \n \n")
+
+    return "".join(lines)
+
+def site_summary(obsnames, locations, target_names, target_coords, times, sep_matrix, threshold, backend='precise', timings=None):
+    """Per-observatory part of the summary for a session evaluated at several sites.
+
+    The separation is geocentric and computed once; each site adds the source
+    and Sun altitudes there for every sample within the threshold.
+    """
+    obstimes = Time(times, format='iso', scale='utc')
+    sun_alt, target_alt = site_altitudes(obstimes, locations, target_coords, backend, timings)
+
+    lines = []
+    for obsname, location, site_sun_alt, site_target_alt in zip(obsnames, locations, sun_alt, target_alt):
+        lines += [
+            "========================================================================================= \n",
+            f"Observatory: {obsname}    lat {location.lat.deg:.3f} deg    lon {location.lon.deg:.3f} deg \n",
+            f"Sun altitude during the session: {site_sun_alt.min():.2f} to {site_sun_alt.max():.2f} deg \n",
+            "========================================================================================= \n",
+            "Source          Obs Time                   Separation Angle     Source Alt     Sun Alt \n",
+        ]
+        for target_name, sep_ang_series, alt_series in zip(target_names, sep_matrix, site_target_alt):
+            for t, sep, alt, sun in zip(times, sep_ang_series, alt_series, site_sun_alt):
+                if sep <= threshold:
+                    lines.append(f"{target_name}        {t}        {sep:.4f}        {alt:.2f}        {sun:.2f} \n")
+        lines.append("\n")
+
+    return "".join(lines)
+
+def source_bodies(body_separations, i):
+    """(body, sep_ang_series, intervals, threshold) of source i for every other body, as summary_block takes them."""
+    return [(body, body_matrix[i], body_crossings[i], body_threshold)
+            for body, (body_threshold, body_matrix, body_crossings) in body_separations.items()]
+
+def source_visibility(visibility, i):
+    """(min_elevation, alt_series, windows) of source i, as summary_block takes it, or None."""
+    if visibility is None:
+        return None
+    min_elevation, alt_matrix, windows = visibility
+    return min_elevation, alt_matrix[i], windows[i]
+
+def process_source_chunk(times, sep_chunk, names_chunk, ra_chunk, dec_chunk, crossings_chunk, threshold, filename_label, body_separations=None, visibility=None):
+    """Process-pool task: (summary block, {file name: PDF bytes}) of every source in a contiguous chunk.
+
+    body_separations and visibility, when given, are sliced to the same chunk of sources.
+    """
+    body_separations = body_separations or {}
+    body_series = [(body, body_matrix, body_threshold) for body, (body_threshold, body_matrix, _) in body_separations.items()]
+    pages = iter_separation_pages(times, sep_chunk, names_chunk, threshold, filename_label, body_series=body_series,
+                                  visibility=visibility and visibility[:2])
+
+    return [(summary_block(name, ra_str, dec_str, times, sep_ang_series, intervals, threshold, source_bodies(body_separations, i),
+                           source_visibility(visibility, i)), files)
+            for i, (name, ra_str, dec_str, sep_ang_series, intervals, files) in enumerate(zip(names_chunk, ra_chunk, dec_chunk, sep_chunk, crossings_chunk, pages))]
+
+# Start method of the plotting pool: the app runs sessions from job threads, and
+# forking a multi-threaded process can hand the workers locks that are never released
+POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# Plotting pools by number of workers, started on first use and shared by every session of the process
+_plotting_pools = {}
+_plotting_pools_lock = threading.Lock()
+
+def plotting_pool(workers):
+    """The process pool with `workers` workers, so consecutive sessions and concurrent jobs skip the worker start-up."""
+    with _plotting_pools_lock:
+        pool = _plotting_pools.get(workers)
+        if pool is None:
+            pool = _plotting_pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context(POOL_START_METHOD))
+        return pool
+
+def discard_plotting_pool(workers):
+    """Forget a broken plotting pool; the next session starts a new one."""
+    with _plotting_pools_lock:
+        pool = _plotting_pools.pop(workers, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def merge_pdf_pages(documents, output):
+    """Write the PDF `documents` (bytes) one after the other into the binary file `output`.
+
+    Every document embeds its own copy of the fonts; the identical objects
+    are shared again before writing.
+    """
+    from pypdf import PdfWriter
+    writer = PdfWriter()
+    for document in documents:
+        writer.append(io.BytesIO(document))
+    writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+    writer.write(output)
+
+# Machine-readable exports written next to summary.txt; parquet needs pyarrow or fastparquet
+EXPORT_FORMATS = ('csv', 'parquet', 'npz')
+
+def session_tables(times, target_names, ra_strings, dec_strings, target_coords, sep_matrix, crossings):
+    """Columnar tables of a session: (separation, sources, crossings) DataFrames.
+
+    separation is the full time x source matrix in degrees, indexed by the UTC
+    sample time, with one column per source list row: the source name, or
+    `name#<row>` for names repeated in the list (e.g. a calibrator observed
+    twice). sources holds the list metadata and each source's closest
+    approach; crossings has one row per enter/exit interval. Index in
+    sources and crossings is the source's row in the list.
+    """
+    import pandas as pd
+    sample_times = pd.DatetimeIndex(pd.to_datetime(times), name='Time (UTC)')
+    repeated = {name for name in target_names if target_names.count(name) > 1}
+    columns = [f"{name}#{i}" if name in repeated else name for i, name in enumerate(target_names)]
+    separation = pd.DataFrame(sep_matrix.T, index=sample_times, columns=columns)
+
+    closest = np.argmin(sep_matrix, axis=1)
+    sources = pd.DataFrame({
+        'Index': np.arange(len(target_names)),
+        'Source': target_names,
+        'RA': ra_strings,
+        'Dec': dec_strings,
+        'RA (deg)': target_coords.ra.deg,
+        'Dec (deg)': target_coords.dec.deg,
+        'Min Separation (deg)': sep_matrix[np.arange(len(target_names)), closest],
+        'Min Separation Time (UTC)': sample_times[closest],
+        'Crossings': [len(intervals) for intervals in crossings],
+    })
+
+    rows = [(i, name, enter.datetime64.astype('datetime64[ms]'), exit.datetime64.astype('datetime64[ms]'), (exit - enter).to_value(u.min))
+            for i, (name, intervals) in enumerate(zip(target_names, crossings)) for enter, exit in intervals]
+    crossing_table = pd.DataFrame(rows, columns=['Index', 'Source', 'Enter (UTC)', 'Exit (UTC)', 'Duration (min)'])
+
+    return separation, sources, crossing_table
+
+def export_session(times, target_names, ra_strings, dec_strings, target_coords, sep_matrix, crossings, filename_label, formats=EXPORT_FORMATS):
+    """Serialise the session tables in the requested formats; returns {file name: bytes}.
+
+    csv and parquet give separation_, sources_ and crossings_<label> files; npz
+    packs every array into one compressed session_<label>.npz that loads
+    without pickle. Parquet is skipped with a warning when no engine is installed.
+    """
+    tables = dict(zip(('separation', 'sources', 'crossings'),
+                      session_tables(times, target_names, ra_strings, dec_strings, target_coords, sep_matrix, crossings)))
+    outputs = {}
+
+    if 'csv' in formats:
+        for name, table in tables.items():
+            outputs[f"{name}_{filename_label}.csv"] = table.to_csv(index=(name == 'separation')).encode()
+
+    if 'parquet' in formats:
+        try:
+            for name, table in tables.items():
+                buffer = io.BytesIO()
+                table.to_parquet(buffer, index=(name == 'separation'))
+                outputs[f"{name}_{filename_label}.parquet"] = buffer.getvalue()
+        except ImportError as e:
+            logger.warning("Skipping the parquet export: %s", e)
+
+    if 'npz' in formats:
+        crossing_table = tables['crossings']
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            times=tables['separation'].index.values.astype('datetime64[s]'),
+            sources=np.array(target_names, dtype=str),
+            ra_deg=target_coords.ra.deg,
+            dec_deg=target_coords.dec.deg,
+            separation=sep_matrix,
+            crossing_source=crossing_table['Index'].to_numpy(dtype=np.int64),
+            crossing_enter=crossing_table['Enter (UTC)'].values.astype('datetime64[ms]'),
+            crossing_exit=crossing_table['Exit (UTC)'].values.astype('datetime64[ms]'),
+        )
+        outputs[f"session_{filename_label}.npz"] = buffer.getvalue()
+
+    return outputs
+
+def solar_exclusion_calendar(target_names, target_coords, start_date, end_date, threshold, step_hours=1, backend='precise'):
+    """Calendar windows between two UTC dates (YYYY-MM-DD, inclusive) when sources are too close to the Sun.
+
+    The whole date range is sampled every `step_hours` in one pass: one Sun
+    track, one (n_sources x n_times) separation matrix and one batched crossing
+    refinement to the minute. Returns a DataFrame with one row per exclusion
+    window.
+    """
+    import pandas as pd
+    start = Time(f"{start_date} 00:00:00", format='iso', scale='utc')
+    end = Time(f"{end_date} 00:00:00", format='iso', scale='utc') + 1 * u.day
+    n_steps = int(np.ceil((end - start).to_value(u.hour) / step_hours))
+    obstimes = start + np.arange(n_steps + 1) * step_hours * u.hour
+
+    sun_ephemeris = session_sun_ephemeris(obstimes, backend)
+    target_xyz = apparent_unit_vectors(target_coords, obstimes)
+    sep_matrix = separation_matrix(sun_ephemeris(obstimes), target_xyz)
+    crossings = find_threshold_crossings(obstimes, sep_matrix, target_xyz, threshold, tolerance_sec=60, sun_ephemeris=sun_ephemeris)
+
+    t_sec = (obstimes - start).sec
+    rows = []
+    for target_name, sep_ang_series, intervals in zip(target_names, sep_matrix, crossings):
+        for enter, exit in intervals:
+            in_window = (t_sec >= (enter - start).sec) & (t_sec <= (exit - start).sec)
+            min_sep = sep_ang_series[in_window].min() if in_window.any() else threshold
+            rows.append({
+                'Source': target_name,
+                'Enter (UTC)': enter.strftime('%Y-%m-%d %H:%M'),
+                'Exit (UTC)': exit.strftime('%Y-%m-%d %H:%M'),
+                'Duration (days)': round((exit - enter).to_value(u.day), 2),
+                'Min Separation (deg)': round(float(min_sep), 2),
+            })
+    calendar = pd.DataFrame(rows, columns=['Source', 'Enter (UTC)', 'Exit (UTC)', 'Duration (days)', 'Min Separation (deg)'])
+
+    return calendar
+
+def format_exclusion_calendar(calendar, start_date, end_date, threshold):
+    """Text table of the exclusion calendar."""
+    return (
+        f"# Windows during which the sources are within {threshold} degrees of the Sun ({start_date} to {end_date}): \n"
+        "----------------------------------------------------------------------------------------- \n"
+        + (calendar.to_string(index=False) if len(calendar) else "No source enters the threshold region.")
+        + "\n"
+    )
+
+def plot_exclusion_calendar(calendar, target_names, start_date, end_date, threshold, figname):
+    """One overview plot of the exclusion windows of every source over the date range (figname may be a file object).
+
+    Like iter_separation_pages the figure is built without pyplot, so the
+    app can draw it from its script threads.
+    """
+    from matplotlib.figure import Figure
+    import matplotlib.dates as mdates
+    import pandas as pd
+    fig = Figure(figsize=(10, max(3, 0.35 * len(target_names) + 1.5)))
+    ax = fig.subplots()
+    for row, target_name in enumerate(target_names):
+        windows = calendar[calendar['Source'] == target_name]
+        enter = mdates.date2num(pd.to_datetime(windows['Enter (UTC)']))
+        exit = mdates.date2num(pd.to_datetime(windows['Exit (UTC)']))
+        ax.broken_barh(list(zip(enter, exit - enter)), (row - 0.4, 0.8), color='red')
+
+    ax.set_yticks(range(len(target_names)))
+    ax.set_yticklabels(target_names)
+    ax.set_ylim(-0.6, len(target_names) - 0.4)
+    ax.invert_yaxis()
+    ax.set_xlim(mdates.date2num(pd.Timestamp(start_date)), mdates.date2num(pd.Timestamp(end_date) + timedelta(days=1)))
+    ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%d-%b-%Y'))
+    ax.set(xlabel='Date (UTC)', title=f'Solar Exclusion Calendar (separation < {threshold} deg) [{start_date} to {end_date}]')
+    ax.grid(True, axis='x')
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    fig.savefig(figname, format='pdf')
+
+def plan_observing_cycle(src_list_file, outputfolder, start_date, end_date, threshold, backend='precise'):
+    """Planner mode: write the exclusion calendar table and overview plot for a date range."""
+    target_names, _, _, target_coords, _ = read_source_list(src_list_file)
+    calendar = solar_exclusion_calendar(target_names, target_coords, start_date, end_date, threshold, backend=backend)
+
+    label = f"{start_date}_to_{end_date}"
+    tablefile = f"{outputfolder}/exclusion_calendar_{label}.txt"
+    with open(tablefile, 'w') as file:
+        file.write(format_exclusion_calendar(calendar, start_date, end_date, threshold))
+
+    figname = f"{outputfolder}/exclusion_calendar_{label}.pdf"
+    plot_exclusion_calendar(calendar, target_names, start_date, end_date, threshold, figname)
+
+    return calendar, tablefile, figname
+
+def start_time_candidates(target_names, target_coords, window_start_ist, window_end_ist, durations, threshold, step_minutes=10, backend='precise'):
+    """Minimum solar separation of every candidate session with a start between two IST times (YYYY-MM-DD HH:MM:SS).
+
+    Starts are spaced `step_minutes` apart and each is tried with every one of
+    the `durations` (hours). A single separation matrix covering the window
+    plus the longest duration is computed up front; a candidate is then the
+    sliding minimum over its samples, so the grid costs no extra ephemeris or
+    separation work. Returns a DataFrame with one row per candidate in start
+    order; it is safe when no source comes within `threshold` of the Sun.
+    """
+    import pandas as pd
+    start = Time(convert_ist_to_utc(window_start_ist), format='iso', scale='utc')
+    n_starts = int((datetime.strptime(window_end_ist, '%Y-%m-%d %H:%M:%S') - datetime.strptime(window_start_ist, '%Y-%m-%d %H:%M:%S')).total_seconds() // (60 * step_minutes)) + 1
+    if n_starts < 1:
+        raise ValueError("The end of the start-time window is before its beginning")
+    steps = {duration: int(round(duration * 60 / step_minutes)) for duration in durations}
+    obstimes = start + np.arange(n_starts + max(steps.values())) * step_minutes * u.min
+
+    sep_matrix = separation_matrix(session_sun_ephemeris(obstimes, backend)(obstimes), apparent_unit_vectors(target_coords, obstimes))
+    # only the closest source at each sample matters for the minimum over a session
+    closest_sep = sep_matrix.min(axis=0)
+    closest_src = sep_matrix.argmin(axis=0)
+
+    start_ist = pd.to_datetime(obstimes[:n_starts].datetime) + timedelta(hours=5, minutes=30)
+    frames = []
+    for duration, n_steps in steps.items():
+        windows = np.lib.stride_tricks.sliding_window_view(closest_sep[:n_starts + n_steps], n_steps + 1)
+        worst = np.arange(n_starts) + windows.argmin(axis=1)
+        frames.append(pd.DataFrame({
+            'Start (IST)': start_ist.strftime('%Y-%m-%d %H:%M'),
+            'End (IST)': (start_ist + timedelta(minutes=n_steps * step_minutes)).strftime('%Y-%m-%d %H:%M'),
+            'Duration (h)': duration,
+            'Min Separation (deg)': np.round(closest_sep[worst], 2),
+            'Closest Source': np.asarray(target_names, dtype=object)[closest_src[worst]],
+            'Safe': closest_sep[worst] > threshold,
+        }))
+
+    return pd.concat(frames, ignore_index=True)
+
+def safe_start_windows(candidates):
+    """Ranked safe start windows: runs of consecutive safe start_time_candidates per duration.
+
+    Each row gives the earliest and latest safe start of a run and its best
+    start, the one with the largest minimum separation. Rows are ranked by
+    that separation, then by duration (longest first).
+    """
+    import pandas as pd
+    rows = []
+    for duration, group in candidates.groupby('Duration (h)', sort=False):
+        safe = group['Safe'].to_numpy()
+        run_id = np.cumsum(np.r_[True, safe[1:] != safe[:-1]])
+        for _, run in group[safe].groupby(run_id[safe]):
+            best = run['Min Separation (deg)'].idxmax()
+            rows.append({
+                'Duration (h)': duration,
+                'Earliest Start (IST)': run['Start (IST)'].iloc[0],
+                'Latest Start (IST)': run['Start (IST)'].iloc[-1],
+                'Best Start (IST)': run.at[best, 'Start (IST)'],
+                'Min Separation (deg)': run.at[best, 'Min Separation (deg)'],
+                'Closest Source': run.at[best, 'Closest Source'],
+            })
+    windows = pd.DataFrame(rows, columns=['Duration (h)', 'Earliest Start (IST)', 'Latest Start (IST)', 'Best Start (IST)',
+                                          'Min Separation (deg)', 'Closest Source'])
+
+    return windows.sort_values(['Min Separation (deg)', 'Duration (h)'], ascending=False, ignore_index=True)
+
+def format_start_windows(windows, window_start_ist, window_end_ist, threshold):
+    """Text table of the ranked safe start windows."""
+    return (
+        f"# Start windows ({window_start_ist} to {window_end_ist} IST) keeping every source more than {threshold} degrees from the Sun: \n"
+        "----------------------------------------------------------------------------------------- \n"
+        + (windows.to_string(index=False) if len(windows) else "No candidate session keeps every source outside the threshold region.")
+        + "\n"
+    )
+
+def plan_start_times(src_list_file, outputfolder, window_start_ist, window_end_ist, durations, threshold, step_minutes=10, backend='precise'):
+    """Optimizer mode: write the ranked safe start windows of the list for a start-time window."""
+    target_names, _, _, target_coords, _ = read_source_list(src_list_file)
+    candidates = start_time_candidates(target_names, target_coords, window_start_ist, window_end_ist, durations, threshold,
+                                       step_minutes, backend)
+    windows = safe_start_windows(candidates)
+
+    tablefile = f"{outputfolder}/start_windows_{window_start_ist[:10]}_to_{window_end_ist[:10]}.txt"
+    with open(tablefile, 'w') as file:
+        file.write(format_start_windows(windows, window_start_ist, window_end_ist, threshold))
+
+    return windows, tablefile
 
 def endtimecalc(startime, obs_time):
     # Convert the string to a datetime object
@@ -164,43 +1388,36 @@ def endtimecalc(startime, obs_time):
     
     return new_time_str
 
-def parse_angle(strngval):
-    # Parse the angle using astropy
-    try:
-        dec_angle = Angle(strngval)
-        print(dec_angle)
-    except ValueError as e:
-        print(f"Error parsing angle: {e}")
-        sys.exit(1)
-    return dec_angle
-    
+@lru_cache(maxsize=8)
+def _parse_observatories(path, mtime):
+    registry = {}
+    with open(path, 'r') as file:
+        for line_no, line in enumerate(file, 1):
+            row = line.split()  # Split by any amount of whitespace
+            if not row:
+                continue
+            if len(row) != 3:
+                raise ValueError(f"{path} line {line_no}: expected Name, Latitude and Longitude, got {line.strip()!r}")
+            registry[row[0]] = (row[1], row[2])
+    logger.debug("%d observatories loaded from %s", len(registry), path)
+    return registry
+
+def load_observatories(obsrv_coord_file):
+    """Observatory registry {name: (lat, long)} of the coord file, parsed once per version of the file."""
+    path = os.path.abspath(obsrv_coord_file)
+    return dict(_parse_observatories(path, os.path.getmtime(path)))
 
 def observatory_coord(obsrv_coord_file, obsname):
-    with open(obsrv_coord_file, 'r') as file:
-        for line in file:
-            print(line)
-            row = re.split(r'\s+', line.strip())  # Split by any amount of whitespace
-            print(row)
-            print(len(row))
-            if len(row) != 3:
-                print("Something is wrong in the psrcoord file \n")
-                sys.exit(1)
-            print(f"0: {row[0]},  1: {row[1]},  2: {row[2]}")
-            if isinstance(row[0], str):
-                print(f"{row[0]} is a string")
-            if isinstance(row[1], str):
-                print(f"{row[1]} is a string")
-            if isinstance(row[2], str):
-                print(f"{row[2]} is a string")
-            
-            if row[0] == obsname:
-                lat = row[1]
-                long = row[2]
-                print(f"The observatory coordinate found")
-                return lat, long
-    print(f"The observatory was not elisted in the observatory coord list. Please Check the file!")
-    sys.exit(1) #code execution stopped
-    return
+    """(lat, long) of one observatory; raises ValueError if it is not in the coord file."""
+    registry = load_observatories(obsrv_coord_file)
+    if obsname not in registry:
+        raise ValueError(f"The observatory {obsname} is not listed in {obsrv_coord_file}")
+    return registry[obsname]
+
+def observatory_locations(obsrv_coord_file, obsnames):
+    """One array-valued EarthLocation holding every named observatory, in order."""
+    coords = np.array([observatory_coord(obsrv_coord_file, obsname) for obsname in obsnames], dtype=float)
+    return EarthLocation(lat=coords[:, 0] * u.deg, lon=coords[:, 1] * u.deg)
 
 def is_leap_year(year):
     """Check if a given year is a leap year."""
@@ -284,88 +1501,614 @@ def labeling(date_part, time_part):
     
     # Format the date object into the desired string
     formatted_date = date_object.strftime("%d%b%Y")
-    print(f"formatted date = {formatted_date}\n")  
+    logger.debug("formatted date = %s", formatted_date)
     
     timesplitpart = time_part.strip().split(":")
     timesrg = timesplitpart[0]+timesplitpart[1]
     
     label = formatted_date + "_" + timesrg
-    print (f"label : {label} \n")
+    logger.debug("label : %s", label)
     
     return label
 
         
-def main(obsrv_coord_file, outputfolder, summary, src_list_file, start_time_ist, obs_time, threshold, obsname, filename_label):
-    
+# Modules only imported by the functions that need them, loaded ahead of time by warm_up
+DEFERRED_IMPORTS = ('pandas', 'matplotlib.dates', 'matplotlib.ticker', 'matplotlib.figure',
+                    'matplotlib.backends.backend_pdf', 'matplotlib.backends.backend_agg')
+
+def warm_up(timings=None):
+    """Pay the one-off start-up costs before the first session instead of during it.
+
+    Imports the DEFERRED_IMPORTS, loads the IERS and leap-second tables and
+    runs a two-sample Sun ephemeris and AltAz transform for today (which also
+    fills today's ephemeris cache). Meant to be called once per process, e.g.
+    in the background when a server starts. Returns the per-stage timings.
+    """
+    if timings is None:
+        timings = {}
+
+    with timed_stage('parsing', timings):
+        for name in DEFERRED_IMPORTS:
+            importlib.import_module(name)
+    obstimes = Time.now() + np.arange(2) * u.hour
+    with timed_stage('ephemeris', timings):
+        suncoord = sun_coord(obstimes)
+    with timed_stage('transforms', timings):
+        suncoord.transform_to(AltAz(obstime=obstimes, location=EarthLocation(lat=0 * u.deg, lon=0 * u.deg)))
+    logger.info("Warm-up done:\n%s", format_stage_timings(timings))
+
+    return timings
+
+def session_times(start_time_ist, obs_time, interval_minutes=10):
+    """UTC sample times (strings) of a session starting at start_time_ist and lasting obs_time hours."""
     end_time_ist = endtimecalc(start_time_ist, obs_time)
     # Convert start and end times from IST to UTC
     start_time_utc = convert_ist_to_utc(start_time_ist)
     end_time_utc = convert_ist_to_utc(end_time_ist)
     
-    # Generate times for the given interval (every 10 minutes)
-    interval_minutes = 10
-    times = generate_time_range(start_time_utc, end_time_utc, interval_minutes)
-    print(f"first times generation in main: {times}")
-    #print(f"# of times = {len(times)}")
-    #sys.exit(1)
-    latitude, longitude = observatory_coord(obsrv_coord_file, obsname)   
-    # Set GMRT location
-    gmrt_location = EarthLocation(lat=latitude, lon=longitude)
-    
-    
+    # Generate times for the given interval (every 10 minutes by default)
+    return generate_time_range(start_time_utc, end_time_utc, interval_minutes)
+
+def screen_catalog(index, start_time_ist, obs_time, threshold, backend='precise', interval_minutes=10, other_bodies=None, location=None):
+    """Sorted indices of the catalog_index sources that come within `threshold` of the Sun during a session.
+
+    Sources within their threshold of one of `other_bodies` ({body: threshold})
+    are kept as well. The tracks are sampled exactly as in
+    session_separations, so the kept sources are the ones it would flag.
+    """
+    obstimes = Time(session_times(start_time_ist, obs_time, interval_minutes), format='iso', scale='utc')
+    sun_ephemeris = session_sun_ephemeris(obstimes, backend)
+    hits = [sources_near_track(index, sun_ephemeris(obstimes), threshold, obstimes)]
+    for body, body_threshold in (other_bodies or {}).items():
+        if body not in PROXIMITY_BODIES:
+            raise ValueError(f"Unknown body {body!r}, expected one of {', '.join(PROXIMITY_BODIES)}")
+        body_ephemeris = session_body_ephemeris(obstimes, body, location)
+        hits.append(sources_near_track(index, body_ephemeris(obstimes), body_threshold, obstimes))
+
+    return np.unique(np.concatenate(hits))
+
+def format_screening(n_kept, n_total):
+    """Summary-file line saying how many catalog sources screen_catalog kept."""
+    return f"# {n_kept} of {n_total} sources come within the threshold during the session; the others are not listed. \n\n"
+
+def session_separations(target_names, target_coords, start_time_ist, obs_time, threshold, backend='precise', timings=None, interval_minutes=10, progress=None, other_bodies=None, location=None, min_elevation=None):
+    """Shared stages of a session: the sample times, the (n_sources x n_times) separation matrix and the crossings.
+
+    `other_bodies` maps further solar-system bodies (see PROXIMITY_BODIES) to
+    their thresholds in degrees; they reuse the same Time array and source
+    unit vectors. AltAz is only computed when `min_elevation` (deg) is given,
+    for the single observatory `location`. Returns (times, sep_matrix,
+    crossings, body_separations, visibility) where body_separations maps
+    each body to its (threshold, sep_matrix, crossings) and visibility is
+    None or (min_elevation, alt_matrix, windows) from find_elevation_windows.
+    """
+    if not target_names:
+        raise ValueError("No valid sources found in the source list")
+    if progress is None:
+        progress = lambda stage, done, total: None
     
-    with open(src_list_file, 'r') as file:
-        for line in file:
-            print(line)
-            row = re.split(r'\s+', line.strip())  # Split by any amount of whitespace
-            print(row)
-            print(len(row))
-            if len(row) < 3:
-                print("Something is wrong in the Srclist file \n")
-                sys.exit(1)
-            print(f"0: {row[0]},  1: {row[1]},  2: {row[2]}")
-            if isinstance(row[0], str):
-                print(f"{row[0]} is a string")
-            if isinstance(row[1], str):
-                print(f"{row[1]} is a string")
-            if isinstance(row[2], str):
-                print(f"{row[2]} is a string")
-            
-            target_name = row[0]
-            RA = parse_angle(row[1]) #converts into degrees
-            print(f"{RA}\n")
-            DEC = parse_angle(row[2]) #converts into degrees
-
-            # Get the positions of the Sun and Pulsar at each time step
-            sun_positions, target_positions, sep_ang_series = get_positions(times, gmrt_location, RA, DEC)
-            
-            if not times or sep_ang_series is None or len(times) != len(sep_ang_series) or not sep_ang_series.any():
-                print(f"Error: Invalid data for target {target_name}. Skipping...")
-                sys.exit(1)
-            
-            # plot the separation angle timeseries
-            plot_separation_angle(times, outputfolder, sep_ang_series, target_name, threshold, filename_label)
-            
-            #writing to a text file
+    times = session_times(start_time_ist, obs_time, interval_minutes)
+    with timed_stage('parsing', timings):
+        obstimes = Time(times, format='iso', scale='utc')
+
+    # Sun's position is computed once for the whole run and shared by every source
+    n_sources = len(target_names)
+    progress('ephemeris', 0, n_sources)
+    with timed_stage('ephemeris', timings):
+        sun_ephemeris = session_sun_ephemeris(obstimes, backend)
+        sun_xyz = sun_ephemeris(obstimes)
+    with timed_stage('transforms', timings):
+        target_xyz = apparent_unit_vectors(target_coords, obstimes)
+    with timed_stage('separation', timings):
+        sep_matrix = separation_matrix(sun_xyz, target_xyz)
+
+    # Refine the grid samples into exact enter/exit times of the threshold region
+    progress('crossings', 0, n_sources)
+    with timed_stage('crossings', timings):
+        crossings = find_threshold_crossings(obstimes, sep_matrix, target_xyz, threshold, sun_ephemeris=sun_ephemeris)
+
+    for target_name, sep_ang_series in zip(target_names, sep_matrix):
+        
+        if not times or sep_ang_series is None or len(times) != len(sep_ang_series) or not sep_ang_series.any():
+            raise ValueError(f"Invalid data for target {target_name}")
+
+    body_separations = {}
+    for body, body_threshold in (other_bodies or {}).items():
+        if body not in PROXIMITY_BODIES:
+            raise ValueError(f"Unknown body {body!r}, expected one of {', '.join(PROXIMITY_BODIES)}")
+        with timed_stage('ephemeris', timings):
+            body_ephemeris = session_body_ephemeris(obstimes, body, location)
+            body_xyz = body_ephemeris(obstimes)
+        with timed_stage('separation', timings):
+            body_matrix = separation_matrix(body_xyz, target_xyz)
+        with timed_stage('crossings', timings):
+            body_crossings = find_threshold_crossings(obstimes, body_matrix, target_xyz, body_threshold, sun_ephemeris=body_ephemeris)
+        body_separations[body] = (body_threshold, body_matrix, body_crossings)
+
+    visibility = None
+    if min_elevation is not None:
+        if location is None or location.shape:
+            raise ValueError("An elevation limit needs a single observatory")
+        progress('visibility', 0, n_sources)
+        alt_matrix = target_altitudes(obstimes, location.reshape((1,)), target_coords, timings)[0]
+        with timed_stage('crossings', timings):
+            windows = find_elevation_windows(obstimes, alt_matrix, target_coords, location, min_elevation)
+        visibility = (min_elevation, alt_matrix, windows)
+
+    return times, sep_matrix, crossings, body_separations, visibility
+
+def iter_session(target_names, ra_strings, dec_strings, target_coords, location, start_time_ist, obs_time, threshold, filename_label, backend='precise', per_source_pdfs=True, workers=1, timings=None, interval_minutes=10, report=None, progress=None, other_bodies=None, min_elevation=None):
+    """Stream the results of one session source by source, in list order.
+
+    The shared stages run first; then every source is yielded as soon as its
+    summary block and plot are ready, as a dict with keys source, ra, dec,
+    times, separation, crossings, bodies, visibility, summary and files
+    ({file name: PDF bytes}). bodies maps every body of `other_bodies`
+    ({body: threshold}) to the source's (threshold, separation, crossings);
+    visibility is None unless `min_elevation` is given, then (min_elevation,
+    altitude, windows) with violations only reported inside the windows.
+    The combined report is written to `report`, a binary file, once the last
+    source has been yielded. With workers > 1 every page is rendered once by
+    the shared plotting_pool, in small chunks, and the report is merged from
+    those pages here. Errors in the inputs raise ValueError on the first
+    iteration.
+    """
+    from matplotlib.backends.backend_pdf import PdfPages
+    if progress is None:
+        progress = lambda stage, done, total: None
+    times, sep_matrix, crossings, body_separations, visibility = session_separations(
+        target_names, target_coords, start_time_ist, obs_time, threshold, backend, timings, interval_minutes, progress,
+        other_bodies, location, min_elevation)
+    body_series = [(body, body_matrix, body_threshold) for body, (body_threshold, body_matrix, _) in body_separations.items()]
+
+    n_sources = len(target_names)
+    pooled = workers > 1 and n_sources > 1 and (per_source_pdfs or report is not None)
+    progress('plotting', 0, n_sources)
+    report_pages = []
+    with PdfPages(report) if report is not None and not pooled else nullcontext() as pdf:
+        if pooled:
+            pool = plotting_pool(workers)
+            # several chunks per worker so the first sources come back early
+            chunks = np.array_split(np.arange(n_sources), min(n_sources, workers * 4))
+            futures = [
+                pool.submit(process_source_chunk, times, sep_matrix[idx],
+                            [target_names[i] for i in idx], [ra_strings[i] for i in idx],
+                            [dec_strings[i] for i in idx], [crossings[i] for i in idx],
+                            threshold, filename_label,
+                            {body: (body_threshold, body_matrix[idx], [body_crossings[i] for i in idx])
+                             for body, (body_threshold, body_matrix, body_crossings) in body_separations.items()},
+                            visibility and (visibility[0], visibility[1][idx], [visibility[2][i] for i in idx]))
+                for idx in chunks
+            ]
+            owners = [(future, offset) for future, idx in zip(futures, chunks) for offset in range(len(idx))]
+        else:
+            pages = iter_separation_pages(times, sep_matrix, target_names, threshold, filename_label,
+                                          per_source_files=per_source_pdfs, pdf=pdf, body_series=body_series,
+                                          visibility=visibility and visibility[:2])
+        for i in range(n_sources):
+            with timed_stage('plotting', timings):
+                if pooled:
+                    future, offset = owners[i]
+                    try:
+                        block, files = future.result()[offset]
+                    except BrokenProcessPool:
+                        discard_plotting_pool(workers)
+                        raise
+                    if report is not None:
+                        report_pages.extend(files.values())
+                    if not per_source_pdfs:
+                        files = {}
+                else:
+                    files = next(pages)
+            if not pooled:
+                with timed_stage('summary I/O', timings):
+                    block = summary_block(target_names[i], ra_strings[i], dec_strings[i], times, sep_matrix[i], crossings[i], threshold,
+                                          source_bodies(body_separations, i), source_visibility(visibility, i))
+            progress('plotting', i + 1, n_sources)
+
+            yield {
+                'source': target_names[i],
+                'ra': ra_strings[i],
+                'dec': dec_strings[i],
+                'times': times,
+                'separation': sep_matrix[i],
+                'crossings': crossings[i],
+                'bodies': {body: (body_threshold, body_matrix[i], body_crossings[i])
+                           for body, (body_threshold, body_matrix, body_crossings) in body_separations.items()},
+                'visibility': source_visibility(visibility, i),
+                'summary': block,
+                'files': files,
+            }
+
+    if report_pages:
+        with timed_stage('plotting', timings):
+            merge_pdf_pages(report_pages, report)
+
+# Options of a session, passed as one `options` dict through main, run_schedule
+# and run_session; see main for their meaning
+SESSION_OPTIONS = {
+    'backend': 'precise',
+    'per_source_pdfs': True,
+    'workers': 1,
+    'interval_minutes': 10,
+    'export_formats': (),
+    'other_bodies': None,
+    'min_elevation': None,
+    'animation_format': None,
+    'near_sun_only': False,
+}
+
+def session_options(options=None):
+    """SESSION_OPTIONS updated with `options`; raises ValueError on an unknown option."""
+    options = dict(options or {})
+    unknown = set(options) - set(SESSION_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown session option(s): {', '.join(sorted(unknown))}")
+    return {**SESSION_OPTIONS, **options}
+
+def run_session(target_names, ra_strings, dec_strings, target_coords, location, start_time_ist, obs_time, threshold, filename_label, options=None, timings=None, parse_errors=(), progress=None, site_names=None, catalog=None, publish=None):
+    """In-memory pipeline for one observing session of already parsed sources.
+
+    Nothing is read from or written to disk, so concurrent sessions (e.g. one
+    per Streamlit user) cannot interfere. Returns (summary_text, outputs,
+    timings): the per-source part of the summary, a {file name: bytes} dict
+    of the PDFs plus the export_session files in the `export_formats` option,
+    and the per-stage timings. progress(stage, done, total), when given, is
+    called as the stages start and as sources are plotted, and
+    publish(summary_text, files) after every source with the summary and
+    per-source PDFs so far. See iter_session for the streaming version and
+    SESSION_OPTIONS for `options`.
+
+    For several observatories pass an array-valued `location` and their
+    `site_names`: the geocentric separation is computed once and a
+    site_summary section is appended. The `other_bodies` option
+    ({body: threshold}) adds the proximity to the Moon and planets and
+    `min_elevation` restricts the violations to the times the source is
+    observable, see iter_session. `animation_format` (one of
+    ANIMATION_FORMATS) adds a sky-map animation of the Sun and source tracks
+    for a single observatory.
+
+    For large catalogs pass `catalog`, the catalog_index of target_coords:
+    only the sources screen_catalog finds within a threshold are processed
+    and listed.
+    """
+    options = session_options(options)
+    backend = options['backend']
+    if timings is None:
+        timings = {}
+    if options['animation_format'] and site_names is not None:
+        raise ValueError("The sky-map animation needs a single observatory")
+
+    summary_text = format_parse_errors(parse_errors) if parse_errors else ""
+    if catalog is not None:
+        with timed_stage('screening', timings):
+            keep = screen_catalog(catalog, start_time_ist, obs_time, threshold, backend, options['interval_minutes'],
+                                  options['other_bodies'], location)
+        summary_text += format_screening(len(keep), len(target_names))
+        target_names = [target_names[i] for i in keep]
+        ra_strings = [ra_strings[i] for i in keep]
+        dec_strings = [dec_strings[i] for i in keep]
+        target_coords = target_coords[keep]
+        if not target_names:
+            return summary_text, {}, timings
+
+    report = io.BytesIO()
+    results = []
+    files = {}
+    for result in iter_session(target_names, ra_strings, dec_strings, target_coords, location, start_time_ist, obs_time,
+                               threshold, filename_label, backend=backend, per_source_pdfs=options['per_source_pdfs'],
+                               workers=options['workers'], timings=timings, interval_minutes=options['interval_minutes'],
+                               report=report, progress=progress, other_bodies=options['other_bodies'],
+                               min_elevation=options['min_elevation']):
+        results.append(result)
+        summary_text += result['summary']
+        files.update(result['files'])
+        if publish is not None:
+            publish(summary_text, dict(files))
+
+    outputs = {f"SeparationAngle_report_{filename_label}.pdf": report.getvalue(), **files}
+    if options['export_formats']:
+        with timed_stage('summary I/O', timings):
+            outputs.update(export_session(results[0]['times'], target_names, ra_strings, dec_strings, target_coords,
+                                          np.array([result['separation'] for result in results]),
+                                          [result['crossings'] for result in results], filename_label,
+                                          options['export_formats']))
+    if options['animation_format']:
+        outputs.update(sky_animation(results[0]['times'], location, target_names, target_coords,
+                                     np.array([result['separation'] for result in results]), threshold, filename_label,
+                                     options['animation_format'], backend, timings, options['min_elevation']))
+    if site_names is not None:
+        summary_text += site_summary(site_names, location, target_names, target_coords, results[0]['times'],
+                                     np.array([result['separation'] for result in results]), threshold, backend, timings)
+
+    return summary_text, outputs, timings
+
+def session_location(obsrv_coord_file, obsname):
+    """(location, site_names) for one observatory name, or for a list of them evaluated together."""
+    if isinstance(obsname, str):
+        latitude, longitude = observatory_coord(obsrv_coord_file, obsname)
+        return EarthLocation(lat=latitude, lon=longitude), None
+    site_names = list(obsname)
+    return observatory_locations(obsrv_coord_file, site_names), site_names
+
+def main(obsrv_coord_file, outputfolder, summary, src_list_file, start_time_ist, obs_time, threshold, obsname, filename_label, options=None, timings=None):
+    """Solar proximity of every source in the list over one session, written to disk.
+
+    File-based wrapper around run_session: appends to the summary file and
+    writes the PDFs and exports into outputfolder. `obsname` may also be a
+    list of observatories, evaluated together in the same run. `options`
+    overrides SESSION_OPTIONS:
+      backend           Sun ephemeris backend, see SUN_BACKENDS
+      per_source_pdfs   also write one PDF per source next to the report
+      workers           worker processes for the per-source plots
+      interval_minutes  sampling interval of the session
+      export_formats    machine-readable tables, see EXPORT_FORMATS
+      other_bodies      {body: threshold in deg} of the Moon and planets to check
+      min_elevation     only flag violations while the source is above this
+                        elevation (deg, GMRT_MIN_ELEVATION is the antennas' limit)
+      animation_format  also write a sky-map animation, see ANIMATION_FORMATS
+      near_sun_only     screen a full catalog through catalog_index and only
+                        list the sources that come within a threshold
+    Returns the per-stage timings (seconds), filled into `timings` when a
+    dict is passed so callers can accumulate over several runs.
+    """
+    options = session_options(options)
+    if timings is None:
+        timings = {}
+
+    with timed_stage('parsing', timings):
+        gmrt_location, site_names = session_location(obsrv_coord_file, obsname)
+        target_names, ra_strings, dec_strings, target_coords, parse_errors = read_source_list(src_list_file)
+    with timed_stage('screening', timings):
+        catalog = catalog_index(target_coords) if options['near_sun_only'] and target_names else None
+
+    try:
+        summary_text, outputs, timings = run_session(
+            target_names, ra_strings, dec_strings, target_coords, gmrt_location, start_time_ist, obs_time,
+            threshold, filename_label, options, timings, parse_errors, site_names=site_names, catalog=catalog)
+    except ValueError:
+        if parse_errors:
             with open(summary, 'a') as file:
-                file.write("----------------------------------------------------------------------------------------- \n")
-                file.write(f"{target_name}        {row[1]}        {row[2]} \n")
-                file.write("----------------------------------------------------------------------------------------- \n")
-                file.write("Source          Obs Time                   Separation Angle \n")
-                
-                for t, s in zip(times, sep_ang_series):
-                    if s <= threshold:
-                        file.write(f"{target_name}        {t}        {s} \n")
-                        
-                file.write("############################################################################################# \n \n")
-            
+                file.write(format_parse_errors(parse_errors))
+        raise
+
+    #writing to a text file
+    with timed_stage('summary I/O', timings):
+        with open(summary, 'a') as file:
+            file.write(summary_text)
+        write_outputs(outputs, outputfolder)
+
+    logger.info("Stage timings for %d sources:\n%s", len(target_names), format_stage_timings(timings))
+
+    return timings
+
+def parse_date(date_str):
+    """YYYY-MM-DD of a DD-MM-YYYY date, validated like prompt_for_date; raises ValueError."""
+    dd, mm, yyyy = map(int, date_str.split('-'))
+    validate_date(dd, mm, yyyy)
+    return f"{yyyy:04d}-{mm:02d}-{dd:02d}"
+
+def parse_ist_time(text):
+    """YYYY-MM-DD HH:MM:SS of a 'DD-MM-YYYY [HH:MM:SS]' time, midnight when the time is left out; raises ValueError."""
+    date_str, _, time_str = text.strip().partition(' ')
+    time_str = time_str.strip() or '00:00:00'
+    datetime.strptime(time_str, '%H:%M:%S')
+    return f"{parse_date(date_str)} {time_str}"
+
+def parse_session(date_str, time_str, duration, threshold):
+    """Validated (date YYYY-MM-DD, time HH:MM:SS, duration in hours, threshold in deg) of one session.
+
+    Takes the date as DD-MM-YYYY, like prompt_for_date; raises ValueError.
+    """
+    date_str = parse_date(date_str)
+    datetime.strptime(time_str, '%H:%M:%S')
+    duration = float(duration)
+    if duration.is_integer():
+        duration = int(duration)
+    if duration < 0 or duration > 24:
+        raise ValueError("Duration in hours cannot be negative or more than 24.")
+    threshold = float(threshold)
+    if threshold < 0 or threshold > 180:
+        raise ValueError("SAthreshold cannot be negative or more than 180 degrees.")
+    return date_str, time_str, duration, threshold
+
+def read_schedule(schedule_file, default_threshold=None):
+    """Sessions of a schedule file, one `DD-MM-YYYY HH:MM:SS duration [threshold]` line each.
+
+    Blank lines and '#' comments are skipped; a missing threshold falls back
+    to default_threshold. Returns a list of parse_session tuples and raises
+    ValueError naming the first bad line.
+    """
+    sessions = []
+    with open(schedule_file, 'r') as file:
+        for line_no, line in enumerate(file, start=1):
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            try:
+                if len(fields) == 3 and default_threshold is not None:
+                    fields.append(default_threshold)
+                if len(fields) != 4:
+                    raise ValueError("expected 'DD-MM-YYYY HH:MM:SS duration [threshold]'")
+                sessions.append(parse_session(*fields))
+            except ValueError as e:
+                raise ValueError(f"{schedule_file}, line {line_no}: {e}") from None
+    return sessions
+
+def run_schedule(obsrv_coord_file, outputfolder, src_list_file, sessions, obsname, options=None, timings=None):
+    """Run many sessions (see read_schedule) in one process, each into its own outputfolder/<label> folder.
+
+    The source list and the observatory location are parsed once (and with
+    the `near_sun_only` option the catalog_index built once), and the Sun
+    tables of every UTC day in the schedule are cached together up front, so
+    each session only pays for its own separation and plots. `options` are
+    those of main. Returns the per-stage timings summed over all sessions.
+    """
+    options = session_options(options)
+    if timings is None:
+        timings = {}
+
+    with timed_stage('parsing', timings):
+        location, site_names = session_location(obsrv_coord_file, obsname)
+        target_names, ra_strings, dec_strings, target_coords, parse_errors = read_source_list(src_list_file)
+    with timed_stage('screening', timings):
+        catalog = catalog_index(target_coords) if options['near_sun_only'] and target_names else None
+
+    if options['backend'] == 'precise' and EPHEMERIS_CACHE_DIR:
+        days = set()
+        for date_part, time_part, obs_time, _ in sessions:
+            start_time_ist = f"{date_part} {time_part}"
+            start, end = Time([convert_ist_to_utc(start_time_ist), convert_ist_to_utc(endtimecalc(start_time_ist, obs_time))]).mjd
+            days.update(range(int(np.floor(start)), int(np.floor(end)) + 1))
+        with timed_stage('ephemeris', timings):
+            try:
+                daily_sun_tables(sorted(days))
+            except OSError as e:
+                logger.warning("Ephemeris cache unavailable (%s), each session computes its own", e)
+
+    obs_label = obsname if isinstance(obsname, str) else ", ".join(obsname)
+    for n, (date_part, time_part, obs_time, threshold) in enumerate(sessions, start=1):
+        filename_label = labeling(date_part, time_part)
+        start_time_ist = f"{date_part} {time_part}"
+        session_folder = os.path.join(outputfolder, filename_label)
+        summary = create_or_clear_directory(session_folder, filename_label)
+        with open(summary, 'a') as file:
+            file.write(f"Observatory Name: {obs_label} \n")
+            file.write(f"Start Time: {start_time_ist} \n")
+            file.write(f"Observation Duration: {obs_time} \n")
+
+        summary_text, outputs, timings = run_session(
+            target_names, ra_strings, dec_strings, target_coords, location, start_time_ist, obs_time,
+            threshold, filename_label, options, timings, parse_errors, site_names=site_names, catalog=catalog)
+        with timed_stage('summary I/O', timings):
+            with open(summary, 'a') as file:
+                file.write(summary_text)
+            write_outputs(outputs, session_folder)
+        logger.info("Session %d/%d (%s) written to %s", n, len(sessions), filename_label, session_folder)
+
+    logger.info("Stage timings for %d sessions of %d sources:\n%s", len(sessions), len(target_names), format_stage_timings(timings))
+
+    return timings
+
+def parse_body_threshold(text):
+    """argparse type for BODY=DEGREES, e.g. moon=5."""
+    body, _, threshold = text.partition('=')
+    body = body.strip().lower()
+    if body not in PROXIMITY_BODIES:
+        raise argparse.ArgumentTypeError(f"unknown body {body!r}, expected one of {', '.join(PROXIMITY_BODIES)}")
+    try:
+        return body, float(threshold)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected BODY=DEGREES, got {text!r}") from None
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Separation angle between the Sun and a list of sources over one or many observing sessions. "
+                    "Without arguments the session is asked for interactively.")
+    parser.add_argument("-s", "--source-list", required=True, help="source list file")
+    modes = parser.add_mutually_exclusive_group()
+    modes.add_argument("--schedule", help="file of sessions, one 'DD-MM-YYYY HH:MM:SS duration [threshold]' line each")
+    modes.add_argument("--plan", nargs=2, metavar=("FROM", "TO"),
+                       help="planner mode: solar exclusion calendar of the list between two dates (DD-MM-YYYY)")
+    modes.add_argument("--optimize-start", nargs=2, metavar=("FROM", "TO"),
+                       help="optimizer mode: rank the safe session starts between two IST times ('DD-MM-YYYY [HH:MM:SS]'), "
+                            "every --interval minutes")
+    parser.add_argument("--lengths", nargs="+", type=float, default=[8.0], metavar="HOURS",
+                        help="session lengths tried by --optimize-start (default: 8)")
+    parser.add_argument("--date", help="session date (DD-MM-YYYY), unless --schedule is given")
+    parser.add_argument("--time", help="session start time in IST (HH:MM:SS), unless --schedule is given")
+    parser.add_argument("--duration", help="session length (hours), unless --schedule is given")
+    parser.add_argument("--threshold", type=float, help="separation angle threshold (deg); default for schedule lines without one")
+    parser.add_argument("--observatory", nargs="+", default=["GMRT"], help="observatory name(s) from the coordinate file")
+    parser.add_argument("--observatory-file", default="ObservatoryCoord.txt", help="observatory coordinate file")
+    parser.add_argument("-o", "--output-folder", default="output_final",
+                        help="output folder, cleared first; with --schedule every session gets its own cleared sub-folder")
+    parser.add_argument("--backend", default="precise", choices=sorted(SUN_BACKENDS), help="Sun ephemeris backend")
+    parser.add_argument("--interval", type=int, default=10, help="sampling interval (minutes)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for the plots")
+    parser.add_argument("--no-per-source-pdfs", action="store_true", help="only write the combined report")
+    parser.add_argument("--export", nargs="+", default=[], choices=EXPORT_FORMATS, help="machine-readable exports")
+    parser.add_argument("--body", action="append", default=[], type=parse_body_threshold, metavar="BODY=DEG",
+                        help="also check the proximity to a Moon/planet, e.g. --body moon=5 (repeatable)")
+    parser.add_argument("--min-elevation", type=float,
+                        help=f"only flag proximity while the source is above this elevation (deg, GMRT: {GMRT_MIN_ELEVATION})")
+    parser.add_argument("--animation", choices=ANIMATION_FORMATS, help="also render a sky-map animation")
+    parser.add_argument("--near-sun-only", action="store_true",
+                        help="screen a large catalog and only list the sources that come within a threshold")
+    args = parser.parse_args(argv)
+    if args.interval < 1:
+        parser.error("--interval must be at least 1 minute")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    try:
+        if args.plan:
+            if args.threshold is None:
+                parser.error("--threshold is required with --plan")
+            args.plan = [parse_date(date_str) for date_str in args.plan]
+            if args.plan[1] < args.plan[0]:
+                parser.error("--plan ends before it starts")
+        elif args.optimize_start:
+            if args.threshold is None:
+                parser.error("--threshold is required with --optimize-start")
+            args.optimize_start = [parse_ist_time(text) for text in args.optimize_start]
+            if args.optimize_start[1] < args.optimize_start[0]:
+                parser.error("--optimize-start ends before it starts")
+            if any(hours <= 0 or hours > 24 for hours in args.lengths):
+                parser.error("--lengths must be more than 0 and at most 24 hours")
+            args.lengths = [int(hours) if hours.is_integer() else hours for hours in args.lengths]
+        elif args.schedule:
+            args.sessions = read_schedule(args.schedule, args.threshold)
+            if not args.sessions:
+                parser.error(f"{args.schedule} contains no sessions")
+        elif None in (args.date, args.time, args.duration, args.threshold):
+            parser.error("--date, --time, --duration and --threshold are required without --schedule")
+        else:
+            args.sessions = [parse_session(args.date, args.time, args.duration, args.threshold)]
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    return args
+
 
 if __name__ == "__main__":
 
-    # Ensure correct number of arguments given by the user
-    if len(sys.argv) != 1:
-        print("Usage: ./<script>.py")
-        sys.exit(1)
+    if not os.environ.get('INPTA_LOG_LEVEL'):
+        enable_logging(logging.WARNING)  # errors from the pipeline still reach the terminal
+    configure_iers()
+
+    if len(sys.argv) > 1:
+        args = parse_args()
+        obs_name = args.observatory[0] if len(args.observatory) == 1 else args.observatory
+        options = dict(backend=args.backend, per_source_pdfs=not args.no_per_source_pdfs, workers=args.workers,
+                       interval_minutes=args.interval, export_formats=args.export, other_bodies=dict(args.body) or None,
+                       min_elevation=args.min_elevation, animation_format=args.animation, near_sun_only=args.near_sun_only)
+        try:
+            if args.plan:
+                os.makedirs(args.output_folder, exist_ok=True)
+                _, tablefile, figname = plan_observing_cycle(args.source_list, args.output_folder, *args.plan,
+                                                             args.threshold, args.backend)
+                logger.info("Exclusion calendar written to %s and %s", tablefile, figname)
+            elif args.optimize_start:
+                os.makedirs(args.output_folder, exist_ok=True)
+                _, tablefile = plan_start_times(args.source_list, args.output_folder, *args.optimize_start, args.lengths,
+                                                args.threshold, args.interval, args.backend)
+                logger.info("Start windows written to %s", tablefile)
+            elif args.schedule:
+                run_schedule(args.observatory_file, args.output_folder, args.source_list, args.sessions, obs_name, options)
+            else:
+                (date_part, time_part, obstime, threshold), = args.sessions
+                filename_label = labeling(date_part, time_part)
+                start_time_ist = f"{date_part} {time_part}"
+                summary_file = create_or_clear_directory(args.output_folder, filename_label)
+                with open(summary_file, 'a') as file:
+                    file.write(f"Observatory Name: {', '.join(args.observatory)} \n")
+                    file.write(f"Start Time: {start_time_ist} \n")
+                    file.write(f"Observation Duration: {obstime} \n")
+                main(args.observatory_file, args.output_folder, summary_file, args.source_list, start_time_ist, obstime,
+                     threshold, obs_name, filename_label, options)
+        except (OSError, ValueError) as e:
+            sys.exit(f"Error: {e}")
+        sys.exit(0)
     
     
     #prompt for source list file
@@ -414,4 +2157,4 @@ if __name__ == "__main__":
         file.write(f"Observation Duration: {obstime} \n")
     
     
-    main(obsrvcoordfile, outputfolder, summary_file, srclistfile, start_time_ist, obstime, threshold, obs_name)
+    main(obsrvcoordfile, outputfolder, summary_file, srclistfile, start_time_ist, obstime, threshold, obs_name, filename_label)
@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+# The pipeline is a top-level module of the repository; tests get a private
+# ephemeris cache so they neither read nor fill the user's one, and use the
+# IERS tables the way the entry points do.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["INPTA_EPHEMERIS_CACHE"] = tempfile.mkdtemp(prefix="inpta_test_ephemeris_")
+
+import script_animate_SepAng_ReadFile_SrcList as pipeline  # noqa: E402
+
+pipeline.configure_iers()
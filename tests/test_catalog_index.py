@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import SkyCoord
+
+import script_animate_SepAng_ReadFile_SrcList as pipeline
+
+START_TIME_IST = "2026-08-18 05:30:00"
+OBS_TIME = 8
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    rng = np.random.default_rng(20260818)
+    # uniform over the sky, plus a cluster around the Sun so small thresholds keep some sources
+    ra = np.concatenate([rng.uniform(0.0, 360.0, 3000), rng.normal(147.0, 3.0, 200) % 360.0])
+    dec = np.concatenate([np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, 3000))), rng.normal(13.0, 3.0, 200)])
+    return SkyCoord(ra * u.deg, dec * u.deg, frame='icrs')
+
+
+@pytest.fixture(scope='module')
+def min_separation(catalog):
+    obstimes = Time(pipeline.session_times(START_TIME_IST, OBS_TIME), format='iso', scale='utc')
+    sun_xyz = pipeline.session_sun_ephemeris(obstimes)(obstimes)
+    target_xyz = pipeline.apparent_unit_vectors(catalog, obstimes)
+    return pipeline.separation_matrix(sun_xyz, target_xyz).min(axis=1)
+
+
+@pytest.mark.parametrize("threshold", [
+    0.5,
+    4.0,      # within one 5 deg cell
+    9.0,
+    23.0,     # a reach of several cells
+    90.0,
+    179.0,
+    179.99,   # every cell of the grid
+    180.0,
+])
+def test_screen_catalog_matches_brute_force(catalog, min_separation, threshold):
+    index = pipeline.catalog_index(catalog)
+    kept = pipeline.screen_catalog(index, START_TIME_IST, OBS_TIME, threshold)
+    expected = np.nonzero(min_separation <= threshold)[0]
+    assert 0 < len(expected)
+    np.testing.assert_array_equal(kept, expected)
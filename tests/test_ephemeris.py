@@ -0,0 +1,53 @@
+import warnings
+
+import numpy as np
+import pytest
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import get_sun
+
+import script_animate_SepAng_ReadFile_SrcList as pipeline
+
+
+def max_angle_arcsec(xyz_a, xyz_b):
+    chord = np.linalg.norm(xyz_a - xyz_b, axis=1)
+    return np.degrees(2.0 * np.arcsin(0.5 * chord).max()) * 3600.0
+
+
+def direct_sun(obstimes):
+    return pipeline.coord_unit_vectors(get_sun(obstimes))
+
+
+@pytest.fixture(autouse=True)
+def quiet_erfa():
+    # ERFA flags pre-1960 and far-future UTC dates as "dubious"; irrelevant here
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+
+def test_fast_backend_within_tolerance_1900_2100():
+    obstimes = Time("1900-01-01") + np.linspace(0.0, 200 * 365.25, 2001) * u.day
+    error_arcmin = max_angle_arcsec(pipeline.solar_unit_vectors(obstimes, 'fast'), direct_sun(obstimes)) / 60.0
+    assert error_arcmin < pipeline.FAST_SUN_TOLERANCE_ARCMIN
+
+
+@pytest.mark.parametrize("start, hours", [
+    ("2025-03-01 02:30:00", 8),
+    ("2016-12-31 12:00:00", 24),   # across a leap second
+    ("2025-06-01 00:00:00", 30 * 24),
+])
+def test_chebyshev_sun_against_get_sun(start, hours):
+    start_time = Time(start, scale='utc')
+    ephemeris, max_error_arcsec = pipeline.chebyshev_ephemeris(start_time, start_time + hours * u.hour)
+    assert max_error_arcsec < pipeline.CHEBYSHEV_ERROR_BOUND_ARCSEC
+
+    obstimes = start_time + np.linspace(0.0, hours, 1001) * u.hour
+    error_arcsec = max_angle_arcsec(ephemeris(obstimes), direct_sun(obstimes))
+    assert error_arcsec < pipeline.CHEBYSHEV_ERROR_BOUND_ARCSEC + pipeline.EPHEMERIS_CACHE_ERROR_ARCSEC
+
+
+def test_ephemeris_cache_across_leap_second():
+    obstimes = Time("2016-12-31 00:05:00", scale='utc') + np.arange(0, 48 * 6) * 10 * u.min
+    error_arcsec = max_angle_arcsec(pipeline.coord_unit_vectors(pipeline.cached_get_sun(obstimes)), direct_sun(obstimes))
+    assert error_arcsec < pipeline.EPHEMERIS_CACHE_ERROR_ARCSEC
@@ -0,0 +1,62 @@
+import warnings
+
+import numpy as np
+import pytest
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import SkyCoord, get_sun
+
+import script_animate_SepAng_ReadFile_SrcList as pipeline
+
+# J1022+1001 passes ~9 deg from the Sun on 2026-08-18 and is occulted on 2026-08-27
+SOURCES = SkyCoord(['10h22m57.99s', '06h13m43.9s', '22h50m00s'], ['+10d01m52.8s', '-02d00m47.2s', '-07d30m00s'], frame='icrs')
+
+
+@pytest.fixture(autouse=True)
+def quiet_astropy():
+    # SkyCoord.separation warns that GCRS is not a pure rotation of ICRS; that is the point here
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+
+def direct_separation(obstimes, coords):
+    sun = get_sun(obstimes)
+    return np.array([sun.separation(coord).deg for coord in coords])
+
+
+@pytest.mark.parametrize("start, hours, step_minutes", [
+    ("2026-08-18 00:00:00", 24, 10),
+    ("2026-08-10 00:00:00", 20 * 24, 60),   # one transform per day
+])
+def test_separation_matrix_matches_skycoord(start, hours, step_minutes):
+    obstimes = Time(start, scale='utc') + np.arange(0, hours * 60 + 1, step_minutes) * u.min
+    target_xyz = pipeline.apparent_unit_vectors(SOURCES, obstimes)
+    sep_matrix = pipeline.separation_matrix(pipeline.solar_unit_vectors(obstimes), target_xyz)
+
+    expected = direct_separation(obstimes, SOURCES)
+    # the light deflection is meaningless behind the solar disk
+    outside_disk = expected > 1.0
+    assert np.abs(sep_matrix - expected)[outside_disk].max() * 3600 < 0.5
+
+
+@pytest.mark.parametrize("start", [
+    "2026-08-18 00:00:00",   # J1022+1001 enters 9 deg at ~03:31 UTC
+    "2026-09-05 12:00:00",   # and leaves it at ~19:00 UTC
+])
+def test_threshold_crossings_match_dense_scan(start):
+    threshold = 9.0
+    obstimes = Time(start, scale='utc') + np.arange(0, 24 * 60 + 1, 10) * u.min
+    sun_ephemeris = pipeline.session_sun_ephemeris(obstimes)
+    target_xyz = pipeline.apparent_unit_vectors(SOURCES[:1], obstimes)
+    sep_matrix = pipeline.separation_matrix(sun_ephemeris(obstimes), target_xyz)
+    (intervals,) = pipeline.find_threshold_crossings(obstimes, sep_matrix, target_xyz, threshold, sun_ephemeris=sun_ephemeris)
+    refined = [t for interval in intervals for t in interval
+               if obstimes[0] < t < obstimes[-1]]
+
+    dense = obstimes[0] + np.arange(0, 24 * 3600 + 1, 4) * u.s
+    inside = direct_separation(dense, SOURCES[:1])[0] <= threshold
+    expected = dense[np.nonzero(inside[1:] != inside[:-1])[0]] + 2 * u.s
+
+    assert len(refined) == len(expected) == 1
+    assert abs((refined[0] - expected[0]).sec) < 10
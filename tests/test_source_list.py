@@ -0,0 +1,72 @@
+import pytest
+import astropy.units as u
+from astropy.coordinates import SkyCoord, FK4, FK5
+
+import script_animate_SepAng_ReadFile_SrcList as pipeline
+
+
+@pytest.mark.parametrize("text, is_ra, expected", [
+    ("06h13m43.9s", True, (6 + 13 / 60 + 43.9 / 3600) * 15),
+    ("06:13:43.9", True, (6 + 13 / 60 + 43.9 / 3600) * 15),     # colon RA is hours
+    ("-02d00m47.2s", False, -(2 + 47.2 / 3600)),
+    ("-02:00:47.2", False, -(2 + 47.2 / 3600)),                 # colon Dec is degrees
+    ("+10d01'52.8\"", False, 10 + 1 / 60 + 52.8 / 3600),
+    ("-00:30:00", False, -0.5),
+    ("93.4329", True, 93.4329),
+    ("6.2h", True, 93.0),
+    ("-2.013", False, -2.013),
+    ("12d30m", False, 12.5),                                    # astropy's Angle fallback
+])
+def test_angle_formats(text, is_ra, expected):
+    assert pipeline.angle_to_deg(text, is_ra) == pytest.approx(expected, abs=1e-9)
+
+
+@pytest.mark.parametrize("text, is_ra", [
+    ("24h00m00s", True),
+    ("-00h10m00s", True),
+    ("360.0", True),
+    ("+90:00:01", False),
+    ("-91.0", False),
+    ("12h61m00s", True),
+    ("10d00m60s", False),
+    ("ten", True),
+])
+def test_out_of_range_or_malformed_angles(text, is_ra):
+    with pytest.raises(ValueError):
+        pipeline.angle_to_deg(text, is_ra)
+
+
+def test_source_list_rows_and_errors():
+    text = "\n".join([
+        "# name  ra  dec  epoch",
+        "J0613-0200  06:13:43.9  -02:00:47.2",
+        "",
+        "J1022+1001  10h22m57.99s  +10d01m52.8s  J2000   # trailing comment",
+        "B1937+21  19:37:28.75  +21:28:01.5  1950.0",
+        "BAD1  25:00:00  +10:00:00",
+        "BAD2  06:13:43.9",
+        "BAD3  06:13:43.9  -02:00:47.2  J2050",
+        "   ",
+        "J2250-0730  342.5  -7.5  2000",
+    ])
+    names, ra_strings, dec_strings, coords, errors = pipeline.parse_source_list(text)
+
+    assert names == ["J0613-0200", "J1022+1001", "B1937+21", "J2250-0730"]
+    assert ra_strings == ["06:13:43.9", "10h22m57.99s", "19:37:28.75", "342.5"]
+    assert dec_strings == ["-02:00:47.2", "+10d01m52.8s", "+21:28:01.5", "-7.5"]
+    assert [error['line'] for error in errors] == [6, 7, 8]
+    assert all(set(error) == {'line', 'text', 'error'} for error in errors)
+    assert errors[0]['text'] == "BAD1  25:00:00  +10:00:00"
+    assert "outside 0-24h" in errors[0]['error']
+    assert "at least Source, RA and Dec" in errors[1]['error']
+    assert "unknown epoch" in errors[2]['error']
+
+    j2000 = SkyCoord(['06h13m43.9s', '22h50m00s'], ['-02d00m47.2s', '-07d30m00s'], frame=FK5(equinox='J2000')).icrs
+    assert coords[[0, 3]].separation(j2000).arcsec.max() < 1e-6
+    b1950 = SkyCoord('19h37m28.75s', '+21d28m01.5s', frame=FK4).icrs
+    assert coords[2].separation(b1950).arcsec < 1e-6
+
+
+def test_empty_source_list():
+    names, ra_strings, dec_strings, coords, errors = pipeline.parse_source_list("# nothing here\n\n")
+    assert names == [] and errors == [] and len(coords) == 0